@@ -0,0 +1,216 @@
+import argparse
+import cProfile
+import csv
+import itertools
+import json
+import logging
+import os
+import pstats
+import resource
+import statistics
+import subprocess
+import sys
+from timeit import default_timer as timer
+
+import main
+
+
+# Every combination of these values is a cell of the benchmark; they map to
+# the main.py options of the same name.
+MATRIX = {
+    'algorithm': ['clique', 'cycle', 'example', 'motif'],
+    'graph': ['er'],
+    'vertices': [100, 200, 500, 1000],
+    'edge_prob': [0.02],
+    'max': [5],
+    'mode': ['static', 'dynamic'],
+    'workers': [1],
+}
+
+OPTIONS = {
+    'algorithm': '-a',
+    'graph': '-g',
+    'vertices': '-n',
+    'edge_prob': '-e',
+    'max': '--max',
+    'mode': '-m',
+    'engine': '--engine',
+    'workers': '-w',
+    'batch': '-b',
+    'updates': '-u',
+    'seed': '--seed',
+}
+
+CSV_FIELDS = ['cell', 'seconds', 'seconds_stdev', 'wall_seconds', 'peak_rss_kb', 'matches', 'updates',
+              'matches_per_second', 'updates_per_second']
+
+LOG = logging.getLogger('BNCH')
+
+
+def cells(matrix):
+    keys = list(matrix)
+    for values in itertools.product(*(matrix[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def cell_name(cell):
+    return ' '.join('%s=%s' % (k, cell[k]) for k in sorted(cell))
+
+
+def cell_argv(cell):
+    argv = []
+    for k, v in sorted(cell.items()):
+        argv += [OPTIONS[k], str(v)]
+    if cell.get('mode') == 'dynamic':
+        argv.append('--reset')  # every edge of the graph is an update
+    return argv
+
+
+def run_cell(cell):
+    # Runs main.main in this process and returns its measurements.
+    args = main.build_parser().parse_args(cell_argv(cell))
+    logging.disable(logging.INFO)
+    start = timer()
+    report = main.main(args)
+    wall = timer() - start
+    phases = [report[phase] for phase in ('static', 'dynamic') if phase in report]
+    seconds = sum(phase['seconds'] for phase in phases)
+    matches = sum(phase['matches'] for phase in phases)
+    updates = report['dynamic']['updates'] if 'dynamic' in report else 0
+    return {
+        'seconds': seconds,
+        'wall_seconds': wall,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'matches': matches,
+        'updates': updates,
+    }
+
+
+def run_isolated(cell):
+    # One fresh interpreter per run, so peak RSS and caches are per run.
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--cell', json.dumps(cell)],
+                            stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def summarize(cell, runs):
+    seconds = [run['seconds'] for run in runs]
+    median = statistics.median(seconds)
+    matches, updates = runs[0]['matches'], runs[0]['updates']
+    return {
+        'cell': cell_name(cell),
+        'config': cell,
+        'runs': runs,
+        'seconds': median,
+        'seconds_stdev': statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+        'wall_seconds': statistics.median(run['wall_seconds'] for run in runs),
+        'peak_rss_kb': max(run['peak_rss_kb'] for run in runs),
+        'matches': matches,
+        'updates': updates,
+        'matches_per_second': matches / median if median > 0 else None,
+        'updates_per_second': updates / median if median > 0 and updates else None,
+    }
+
+
+def benchmark(matrix, repeats=3, warmups=1):
+    results = []
+    for cell in cells(matrix):
+        LOG.info('Running %s...' % cell_name(cell))
+        for _ in range(warmups):
+            run_isolated(cell)
+        result = summarize(cell, [run_isolated(cell) for _ in range(repeats)])
+        LOG.info(' - %0.4f seconds (median of %d), %d matches, peak RSS %d KB'
+                 % (result['seconds'], repeats, result['matches'], result['peak_rss_kb']))
+        results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Returns the cells that got slower than the baseline by more than
+    # threshold (relative), after logging every cell's change.
+    previous = {result['cell']: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result['cell'])
+        if old is None or old['seconds'] <= 0:
+            continue
+        change = result['seconds'] / old['seconds'] - 1
+        if result['matches'] != old['matches']:
+            LOG.warning('%s: %d matches instead of %d' % (result['cell'], result['matches'], old['matches']))
+        if change > threshold:
+            LOG.warning('%s: %+0.1f%% (%0.4f -> %0.4f seconds)' % (result['cell'], 100 * change, old['seconds'], result['seconds']))
+            regressions.append(result['cell'])
+        else:
+            LOG.info('%s: %+0.1f%%' % (result['cell'], 100 * change))
+    return regressions
+
+
+def write_csv(results, path):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def profile(cell, path, top=20):
+    cProfile.runctx('run_cell(cell)', globals(), {'cell': cell}, path)
+    pstats.Stats(path).sort_stats('cumulative').print_stats(top)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--matrix', help='JSON file with the matrix to run (default: MATRIX)', default=None, type=str)
+    for name, values in MATRIX.items():
+        parser.add_argument('--%s' % name, help='values of %s (default: %s)' % (name, ' '.join(map(str, values))),
+                            nargs='+', type=type(values[0]))
+    parser.add_argument('--repeats', help='measured runs per cell', default=3, type=int)
+    parser.add_argument('--warmups', help='discarded runs per cell', default=1, type=int)
+    parser.add_argument('-o', '--output', help='JSON results file', default='benchmark.json', type=str)
+    parser.add_argument('--csv', help='also write the results as CSV', default=None, type=str)
+    parser.add_argument('--baseline', help='JSON results file to compare against', default=None, type=str)
+    parser.add_argument('--threshold', help='relative slowdown reported as a regression', default=0.1, type=float)
+    parser.add_argument('--profile', help='profile the first cell of the matrix with cProfile into this file', default=None, type=str)
+    parser.add_argument('--cell', help=argparse.SUPPRESS, default=None, type=str)
+    parser.add_argument('-v', '--verbose', help='verbose', action='store_true')
+    parser.set_defaults(verbose=False)
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+
+    if args.cell is not None:
+        # a single isolated run, see run_isolated
+        print(json.dumps(run_cell(json.loads(args.cell))))
+        sys.exit(0)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)-8s [%(name)s]  %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S")
+
+    matrix = dict(MATRIX)
+    if args.matrix is not None:
+        with open(args.matrix) as file:
+            matrix.update(json.load(file))
+    for name in MATRIX:
+        if getattr(args, name) is not None:
+            matrix[name] = getattr(args, name)
+
+    if args.profile is not None:
+        profile(next(cells(matrix)), args.profile)
+        sys.exit(0)
+
+    results = benchmark(matrix, args.repeats, args.warmups)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    LOG.info('Wrote results to \'%s\'' % args.output)
+    if args.csv is not None:
+        write_csv(results, args.csv)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            LOG.warning('%d regressions over %0.0f%%' % (len(regressions), 100 * args.threshold))
+            sys.exit(1)
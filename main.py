@@ -1,11 +1,65 @@
 import argparse
 import logging
-import matplotlib.pyplot as plt
-import networkx as nx
 import random
 from timeit import default_timer as timer
 
-from tesseract import algorithms, canonical, graph, io, mining
+from tesseract import algorithms, graph, io, labels, mining, parallel, sampling, service, snapshot, stats, stream
+
+EXAMPLES = {
+    'example1': (6, [(0, 3), (0, 4), (0, 5), (1, 2), (1, 4), (1, 5), (2, 5), (3, 4)]),
+    'example2': (5, [(0, 3), (2, 1), (2, 4), (3, 2)]),
+}
+
+
+def load_graph(args, graph_class=graph.CSRGraph):
+    if args.graph in EXAMPLES:
+        n, edges = EXAMPLES[args.graph]
+        return graph_class.from_edges([u for u, _ in edges], [v for _, v in edges], num_vertices=n)
+
+    if '.xsc' in args.graph:
+        key = snapshot.file_key(args.graph)
+        build = lambda: graph_class.from_edges(*io.read_xsc_edges(args.graph), relabel=True)
+    elif '.txt' in args.graph:
+        key = snapshot.file_key(args.graph)
+        build = lambda: graph_class.from_edges(*io.read_txt_edges(args.graph), relabel=True)
+    else:
+        key = snapshot.generator_key(args.graph, args.vertices, args.edge_prob, args.seed)
+        build = lambda: graph_class.from_edges(*graph.gnp_random_edges(args.vertices, args.edge_prob, args.seed), num_vertices=args.vertices)
+
+    if args.snapshots is None:
+        return build()
+    return snapshot.cached(args.snapshots, key, build, graph_class, refresh=args.build_snapshot)
+
+
+def label_query(args, G):
+    index = labels.load(G, args.labels, args.edge_labels)
+    anchor = index.label_id(args.anchor) if args.anchor is not None else None
+    allowed = [index.label_id(name) for name in args.allowed_labels.split(',')] if args.allowed_labels else None
+    allowed_edges = [index.label_id(name) for name in args.allowed_edge_labels.split(',')] if args.allowed_edge_labels else None
+    return labels.LabelQuery(index, anchor, allowed, allowed_edges)
+
+
+def log_results(log, alg):
+    if isinstance(alg, algorithms.Composite):
+        for name, member in alg.algorithms.items():
+            log.info(' - %s: %d matches, %d filters' % (name, member.num_found, member.num_filters))
+            log_results(log, member)
+    elif isinstance(alg, algorithms.MotifCounting):
+        for name, count in alg.summary():
+            log.info(' - Motif %s: %d' % (name, count))
+
+
+def phase_report(alg, phase, seconds):
+    report = {'seconds': seconds, 'matches': alg.num_found, 'filters': alg.num_filters}
+    if isinstance(alg, algorithms.Composite):
+        report['algorithms'] = {name: phase_report(member, phase, seconds) for name, member in alg.algorithms.items()}
+    if isinstance(alg, algorithms.MotifCounting):
+        report['motifs'] = dict(alg.summary())
+    if alg.stats is not None:
+        alg.stats.add_time(phase, seconds)
+        report.update(alg.stats.to_dict())
+    return report
+
 
 def main(args):
 
@@ -17,76 +71,122 @@ def main(args):
     LOG = logging.getLogger('MAIN')
     LOG_STATS = logging.getLogger('STAT')
 
+    if args.build_snapshot and args.snapshots is None:
+        args.snapshots = 'snapshots'
+
     LOG.info('Loading graph \'%s\'...' % args.graph)
     start = timer()
-    if args.graph == 'example1':
-        G = nx.Graph()
-        G.add_nodes_from(range(0, 6))
-        G.add_edges_from([(0, 3), (0, 4), (0, 5), (1, 2), (1, 4), (1, 5), (2, 5), (3, 4)])
-    elif args.graph == 'example2':
-        G = nx.Graph()
-        G.add_nodes_from(range(0, 5))
-        G.add_edges_from([(0, 3), (2, 1), (2, 4), (3, 2)])
-    elif '.xsc' in args.graph:
-        G = nx.Graph()
-        input_iter = io.read_xsc_graph(args.graph)
-        for edge in input_iter:
-            [u, v] = edge
-            if not G.has_node(u):
-                G.add_node(u)
-            if not G.has_node(v):
-                G.add_node(v)
-            G.add_edge(u, v)
-
-    elif '.txt' in args.graph:
-        G = nx.Graph()
-        input_iter = io.read_txt_graph(args.graph)
-        for edge in input_iter:
-            [u, v] = edge
-            if not G.has_node(u):
-                G.add_node(u)
-            if not G.has_node(v):
-                G.add_node(v)
-            G.add_edge(u, v)
-    else:
-        G = nx.fast_gnp_random_graph(args.vertices, args.edge_prob, args.seed)
+    static = args.mode == 'static' and args.stream is None and args.serve is None
+    G = load_graph(args, graph.CSRGraph if static else graph.DynamicGraph)
     end = timer()
+    load_time = end - start
     LOG_STATS.info('Read/generated graph in %0.4f seconds' % (end - start))
-    LOG_STATS.info('Graph has %d vertices and %d edges' % (len(G.nodes), len(G.edges)))
+    LOG_STATS.info('Graph has %d vertices and %d edges' % (G.number_of_nodes(), G.number_of_edges()))
+
+    if args.build_snapshot:
+        return
 
     if args.plot:
+        import matplotlib.pyplot as plt
+        import networkx as nx
         plt.subplot(121)
-        nx.draw(G, with_labels=True, font_weight='bold')
+        nx.draw(nx.Graph(list(G.edges())), with_labels=True, font_weight='bold')
         plt.show()
 
-    file = open(args.file, 'w') if args.file is not None else None
-    output = io.PatternOutput(file, args.canonical, args.sort, log_patterns=args.log_patterns)
+    query = None
+    if args.labels is not None or args.edge_labels is not None:
+        if args.stream is not None or args.serve is not None:
+            LOG.warning('Labels are ignored by --stream and --serve')
+        else:
+            query = label_query(args, G)
+            G = labels.restrict(G, query)
 
-    if args.algorithm == 'clique':
-        alg = algorithms.CliqueFinding(output, args.max if args.max else None)
-    elif args.algorithm == 'cycle':
-        alg = algorithms.CycleFinding(output, args.max if args.max else None)
-    elif args.algorithm.startswith('example'):
-        alg = algorithms.ExampleTree(output, args.max if args.max else None)
+    if args.file is not None and args.format == 'binary':
+        output = io.BinaryPatternOutput(args.file, args.canonical, args.sort, log_patterns=args.log_patterns,
+                                        codes=args.codes, compress=args.compress)
+    elif args.file is not None or args.log_patterns:
+        file = open(args.file, 'w') if args.file is not None else None
+        output = io.PatternOutput(file, args.canonical, args.sort, log_patterns=args.log_patterns, codes=args.codes)
     else:
-        alg = algorithms.Algorithm(output, args.max if args.max else None)
+        output = io.NullOutput()
+
+    alg = algorithms.create(args.algorithm, output, args.max if args.max else None, args.min)
+    if query is not None and query.anchor is not None:
+        alg.labels = query  # the restricted graph takes care of the other labels
+
+    if args.serve is not None:
+        # matches go to the service's subscribers instead of output, those
+        # of a Composite's members under their own names
+        algs = alg.algorithms if isinstance(alg, algorithms.Composite) else {args.algorithm: alg}
+        service.run(G, algs, args.serve, initialize=args.mode != 'dynamic', max_vertices=args.max_vertices)
+        return
+
+    report = {'graph': args.graph, 'algorithm': args.algorithm, 'load_seconds': load_time}
+    if args.stats is not None:
+        alg.stats = stats.ExplorationStats()
+
+    if args.sample is not None and (args.mode == 'static' or args.mode == 'both'):
+        LOG.info('Estimating the matches of algorithm \'%s\' with %s sampling' % (args.algorithm, args.sample))
+        start = timer()
+        estimate = sampling.approximate_count(G, alg, args.sample, args.samples, args.time_budget, args.workers, args.seed)
+        end = timer()
+        LOG_STATS.info('Drew %d samples in %0.4f seconds' % (estimate.samples, end - start))
+        for tpe in sorted(estimate.sums, key=str):
+            value, low, high = estimate.interval(tpe, args.confidence)
+            LOG_STATS.info(' - %s: %0.1f (%g%% confidence interval %0.1f - %0.1f)' % (tpe, value, 100 * args.confidence, low, high))
+        report['static'] = {'seconds': end - start, 'matches': round(estimate.interval(sampling.TOTAL)[0]),
+                            'approximate': estimate.to_dict(args.confidence)}
 
-    if args.mode == 'static' or args.mode == 'both':
+    elif args.mode == 'static' or args.mode == 'both':
         alg.reset_stats()
         LOG.info('Running forwards exploration with algorithm \'%s\'' % args.algorithm)
         start = timer()
-        mining.forwards_explore_all(G, alg)
+        if alg.labels is not None:
+            labels.anchored_explore_all(G, alg, query, prune_graph=args.prune)
+        elif args.workers > 1:
+            parallel.forwards_explore_all_parallel(G, alg, args.workers, prune_graph=args.prune)
+        else:
+            mining.forwards_explore_all(G, alg, prune_graph=args.prune)
         end = timer()
         LOG_STATS.info('Ran forwards exploration in %0.4f seconds' % (end - start))
         LOG_STATS.info(' - Found %d matches' % alg.num_found)
         LOG_STATS.info(' - Executed %d filters' % alg.num_filters)
+        log_results(LOG_STATS, alg)
+        report['static'] = phase_report(alg, 'explore', end - start)
 
-    if args.mode == 'dynamic' or args.mode == 'both':
+    if args.stream is not None:
         alg.reset_stats()
+        if args.reset:
+            G = graph.DynamicGraph.empty(ids=G.ids)  # reset graph
+        if args.prune:
+            mining.track_cores(G, alg)
+        LOG.info('Running middle-out exploration with algorithm \'%s\' on the updates of \'%s\'' % (args.algorithm, args.stream))
+        file = stream.open_updates(args.stream)
+        try:
+            num_updates, seconds, latencies = stream.explore_stream(G, alg, stream.read_updates(file), args.batch, args.window)
+        finally:
+            if args.stream != '-':
+                file.close()
+        latency = latencies.to_dict()
+        LOG_STATS.info('Ran middle-out exploration of %d updates in %0.4f seconds' % (num_updates, seconds))
+        LOG_STATS.info(' - Throughput %0.1f updates/second' % (num_updates / seconds if seconds > 0 else 0))
+        if num_updates > 0:
+            LOG_STATS.info(' - Latency p50 %0.6f, p95 %0.6f, p99 %0.6f, max %0.6f seconds'
+                           % (latency['p50'], latency['p95'], latency['p99'], latency['max']))
+        LOG_STATS.info(' - Found %d matches' % alg.num_found)
+        LOG_STATS.info(' - Executed %d filters' % alg.num_filters)
+        log_results(LOG_STATS, alg)
+        report['dynamic'] = phase_report(alg, 'updates', seconds)
+        report['dynamic']['updates'] = num_updates
+        report['dynamic']['latency'] = latency
+
+    elif args.mode == 'dynamic' or args.mode == 'both':
+        alg.reset_stats()
+        random.seed(args.seed)  # same updates in the same order on every run
         if args.mode == 'dynamic':
-            updates = list(map(lambda t: list(t), list(G.edges)[:args.updates] if args.updates else list(G.edges)))  # get list of list, not list of tuples
+            updates = list(map(lambda t: list(t), list(G.edges())[:args.updates] if args.updates else list(G.edges())))  # get list of list, not list of tuples
             if args.reset:
-                G = nx.Graph()  # reset graph
+                G = graph.DynamicGraph.empty(ids=G.ids)  # reset graph
         elif args.graph == 'example':
             updates = [[1, 3], [0, 1]]
         else:
@@ -94,35 +194,65 @@ def main(args):
             for _ in range(0, args.updates):
                 valid = False
                 while not valid:
-                    edge = [random.randint(0, len(G.nodes)), random.randint(0, args.vertices)]
+                    edge = [random.randint(0, G.number_of_nodes()), random.randint(0, args.vertices)]
                     if edge[0] != edge[1] and not G.has_edge(edge[0], edge[1]) and edge not in updates:
                         valid = True
                         updates.append(edge)
 
-        LOG.info('Running middle-out exploration with algorithm \'%s\' and %d updates' % (args.algorithm, len(updates)))
+        if args.prune:
+            mining.track_cores(G, alg)
+        LOG.info('Running %s exploration with algorithm \'%s\' and %d updates' % (args.engine, args.algorithm, len(updates)))
+
+        if query is not None:
+            updates = [update for update in updates if query.allows_edge(update[0], update[1])]
 
         random.shuffle(updates)
+        existing = sum(1 for u, v in updates if u == v or G.has_edge(u, v))
+        if existing:
+            LOG.warning('Skipping %d updates already in the graph (see --reset)' % existing)
 
         start = timer()
-        for i, update in enumerate(updates):
-            if i < 1000 and i % 100 == 0 or i % 1000 == 0:
+        if args.batch:
+            for i in range(0, len(updates), args.batch):
                 LOG.info('Processed updates: %d / %d' % (i, len(updates)))
-            LOG.debug('Processing update %s' % str(update))
-            mining.middleout_explore_update(G, alg, update, add_to_graph=True)
-            LOG_STATS.debug('Found %d matches' % alg.num_found)
-            LOG_STATS.debug('Executed %d filters' % alg.num_filters)
+                if args.engine == 'backwards':
+                    mining.backwards_explore_batch(G, alg, updates[i:i + args.batch])
+                elif args.workers > 1:
+                    parallel.middleout_explore_batch_parallel(G, alg, updates[i:i + args.batch], args.workers)
+                else:
+                    mining.middleout_explore_batch(G, alg, updates[i:i + args.batch])
+                LOG_STATS.debug('Found %d matches' % alg.num_found)
+                LOG_STATS.debug('Executed %d filters' % alg.num_filters)
+        else:
+            for i, update in enumerate(updates):
+                if i < 1000 and i % 100 == 0 or i % 1000 == 0:
+                    LOG.info('Processed updates: %d / %d' % (i, len(updates)))
+                LOG.debug('Processing update %s' % str(update))
+                if args.engine == 'backwards':
+                    mining.backwards_explore_update(G, alg, update, add_to_graph=True)
+                else:
+                    mining.middleout_explore_update(G, alg, update, add_to_graph=True)
+                LOG_STATS.debug('Found %d matches' % alg.num_found)
+                LOG_STATS.debug('Executed %d filters' % alg.num_filters)
         end = timer()
-        LOG_STATS.info('Ran middle-out exploration in %0.4f seconds' % (end - start))
+        LOG_STATS.info('Ran %s exploration in %0.4f seconds' % (args.engine, end - start))
         LOG_STATS.info(' - Found %d matches' % alg.num_found)
         LOG_STATS.info(' - Executed %d filters' % alg.num_filters)
+        log_results(LOG_STATS, alg)
+        report['dynamic'] = phase_report(alg, 'updates', end - start)
+        report['dynamic']['updates'] = len(updates)
 
-    if file is not None:
-        file.close()
+    output.close()
 
-if __name__ == '__main__':
-    
+    if args.stats is not None:
+        stats.dump(report, args.stats)
+        LOG.info('Wrote exploration stats to \'%s\'' % args.stats)
+    return report
+
+
+def build_parser():
     parser = argparse.ArgumentParser()
-    parser.add_argument('-a', '--algorithm', help='algorithm to run', default='clique', type=str)
+    parser.add_argument('-a', '--algorithm', help='algorithm to run (clique, cycle, motif, example), or several separated by commas explored together', default='clique', type=str)
     parser.add_argument('-g', '--graph', help='choice of graph', default='er', type=str)
     parser.add_argument('-m', '--mode', help='mode to run (static, dynamic, both)', default='both', type=str)
     parser.add_argument('-p', '--plot', help='plot graph', action='store_true')
@@ -131,18 +261,48 @@ if __name__ == '__main__':
     parser.add_argument('-e', '--edge_prob', help='probability of an edge', default=0.02, type=float)
     parser.add_argument('-u', '--updates', help='number of updates', type=int)
     parser.add_argument('--max', help='maximum pattern size', type=int)
+    parser.add_argument('--min', help='minimum clique size', type=int)
+    parser.add_argument('--no-prune', help='explore all vertices, even those below the core the matches are in', dest='prune', action='store_false')
+    parser.set_defaults(prune=True)
     parser.add_argument('--seed', help='random graph generator seed', default=42, type=int)
+    parser.add_argument('-w', '--workers', help='number of worker processes for static mining and update batches', default=1, type=int)
+    parser.add_argument('--engine', help='exploration engine of dynamic mode; backwards is sequential', default='middleout', choices=('middleout', 'backwards'))
+    parser.add_argument('-b', '--batch', help='number of updates explored together in dynamic mode', type=int)
+    parser.add_argument('--stream', help='read updates \'[+|-] u v [timestamp]\' from this file (- for stdin) in dynamic mode, one at a time unless -b or --window is set', default=None, type=str)
+    parser.add_argument('--window', help='close micro-batches of streamed updates after this many seconds', type=float)
+    parser.add_argument('--serve', help='serve updates and queries on unix:PATH or HOST:PORT (see tesseract/service.py)', default=None, type=str)
+    parser.add_argument('--max-vertices', help='number of vertices updates to --serve may grow the graph to', default=1 << 24, type=int)
+    parser.add_argument('--sample', help='estimate the static matches by sampling (roots, walks) instead of enumerating them', default=None, type=str)
+    parser.add_argument('--samples', help='number of samples (default: 1000 without --time-budget)', type=int)
+    parser.add_argument('--time-budget', help='sample for this many seconds', type=float)
+    parser.add_argument('--confidence', help='confidence level of the reported intervals', default=0.95, type=float)
     parser.add_argument('-f', '--file', help='output file for patterns', default=None, type=str)
+    parser.add_argument('--format', help='format of the output file', default='text', choices=('text', 'binary'))
+    parser.add_argument('--compress', help='zlib-compress binary output', action='store_true')
+    parser.set_defaults(compress=False)
     parser.add_argument('--log_patterns', help='log found patterns', action='store_true')
     parser.set_defaults(log_patterns=False)
     parser.add_argument('--canonical', help='canonicalize patterns à la Arabesque before outputting', action='store_true')
     parser.set_defaults(canonical=False)
     parser.add_argument('--sort', help='sort patterns before outputting', action='store_true')
     parser.set_defaults(sort=False)
+    parser.add_argument('--codes', help='output the isomorphism class code of every pattern', action='store_true')
+    parser.set_defaults(codes=False)
+    parser.add_argument('--labels', help='file of \'vertex label\' lines (static and dynamic mode)', default=None, type=str)
+    parser.add_argument('--edge-labels', help='file of \'u v label\' lines (static and dynamic mode)', default=None, type=str)
+    parser.add_argument('--anchor', help='only report matches with a vertex of this label, exploring from those vertices', default=None, type=str)
+    parser.add_argument('--allowed-labels', help='comma-separated vertex labels matches may have (default: any)', default=None, type=str)
+    parser.add_argument('--allowed-edge-labels', help='comma-separated edge labels matches may have (default: any)', default=None, type=str)
     parser.add_argument('-r', '--reset', help='reset graph', action='store_true')
     parser.set_defaults(reset=False)
+    parser.add_argument('--snapshots', help='directory of cached graph snapshots', default=None, type=str)
+    parser.add_argument('--build-snapshot', help='build or refresh the graph snapshot, then exit', action='store_true')
+    parser.set_defaults(build_snapshot=False)
+    parser.add_argument('--stats', help='collect exploration stats and write them to this JSON file', default=None, type=str)
     parser.add_argument('-v', '--verbose', help='verbose', action='store_true')
     parser.set_defaults(verbose=False)
-    args = parser.parse_args()
+    return parser
 
-    main(args)
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
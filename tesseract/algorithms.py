@@ -1,40 +1,107 @@
-import copy
 import logging
 import math
 
-from tesseract import canonical
+from tesseract import patterns
 
 
 class Algorithm:
     def __init__(self, out, max=math.inf):
-        self.max = max
+        self.max = max if max is not None else math.inf
         self.num_filters = 0
         self.num_found = 0
+        self.sign = 1
         self.out = out
+        self.stats = None  # stats.ExplorationStats, filled by the explorers when set
+        self.labels = None  # labels.LabelQuery the matches must satisfy
+        self.shared = None  # per-embedding values the members of a Composite share
         self.log = logging.getLogger('ALGO')
 
     def filter(self, e, G, last_v):
         self._inc_filter()
         return True
 
+    def min_degree(self):
+        # Lower bound on the degree of every vertex inside a match: no vertex
+        # of core number below it can be in one (see mining.prune).
+        # Embeddings are connected and have at least two vertices.
+        return 1
+
+    def anchored(self, e):
+        return self.labels is None or self.labels.anchored(e)
+
     def process(self, e, G):
-        self._inc_found()
-        self.out.found(e, G)
+        if self.anchored(e):
+            self._inc_found(e)
+            if self.out.enabled:
+                self._found(e, G)
+
+    def _masks(self, e, G):
+        # patterns.adjacency_masks of e, computed once for all the members of
+        # a Composite processing e (see Composite.process)
+        shared = self.shared
+        if shared is None:
+            return patterns.adjacency_masks(e, G)
+        masks = shared.get('masks')
+        if masks is None:
+            masks = shared['masks'] = patterns.adjacency_masks(e, G)
+        return masks
+
+    def begin_update(self, edges, sign=1):
+        # Called before exploring from a set of updated edges. sign is -1 when
+        # the edges are about to be removed: the matches found are lost ones.
+        self.sign = sign
+
+    def end_update(self):
+        self.sign = 1
+
+    def finish(self):
+        # Called once a static exploration of the whole graph is over
+        pass
+
+    def prefix_state(self, e):
+        # What the algorithm remembers about the embedding e being extended,
+        # for another worker to resume its exploration (see parallel.py)
+        return None
+
+    def resume(self, e, state):
+        pass
+
+    def _found(self, e, G, tpe=None):
+        if self.sign > 0:
+            self.out.found(e, G, tpe=tpe)
+        else:
+            self.out.lost(e, G, tpe=tpe)
 
     def _inc_filter(self):
         self.num_filters += 1
 
-    def _inc_found(self):
-        self.num_found += 1
+    def _inc_found(self, e):
+        self.num_found += self.sign
+        if self.stats is not None:
+            self.stats.match(len(e))
 
     def reset_stats(self):
         self.num_filters = 0
         self.num_found = 0
+        if self.stats is not None:
+            self.stats.reset()
+
+    def merge(self, other):
+        # adds the stats of a copy of this algorithm that ran elsewhere
+        self.num_filters += other.num_filters
+        self.num_found += other.num_found
+        if self.stats is not None and other.stats is not None:
+            self.stats.merge(other.stats)
 
 
 class CliqueFinding(Algorithm):
-    def __init__(self, out, max=math.inf):
+    def __init__(self, out, max=math.inf, intersect=True, min=None):
         super().__init__(out, max)
+        self.intersect = intersect  # use the clique engine (see cliques.py)
+        self.min = 3 if min is None or min < 3 else min  # smallest clique reported
+
+    def min_degree(self):
+        return self.min - 1
 
     def filter(self, e, G, last_v):
         super()._inc_filter()
@@ -58,14 +125,15 @@ class CliqueFinding(Algorithm):
         # And yet another (slower)
         """
         v = last_v if last_v is not None else e[-1]
-        edges_added_with_expansion = [edge for edge in G.edges(v) if edge[1] in e]  # for directed, need edges going to v, not from v
+        edges_added_with_expansion = [u for u in G.neighbors(v) if u in e]
         return len(edges_added_with_expansion) == len(e) - 1
         """
 
     def process(self, e, G):
-        if len(e) >= 3:
-            self._inc_found()
-            self.out.found(e, G, tpe='%d-clique' % len(e))
+        if len(e) >= self.min and self.anchored(e):
+            self._inc_found(e)
+            if self.out.enabled:
+                self._found(e, G, tpe='%d-clique' % len(e))
 
 
 class CycleFinding(Algorithm):
@@ -76,35 +144,19 @@ class CycleFinding(Algorithm):
         super()._inc_filter()
         return True
 
-    def process(self, e, G):
-        if len(e) > 2 and CycleFinding._is_cycle(e, G):
-            self._inc_found()
-            self.out.found(e, G, tpe='%d-cycle' % len(e))
-
-    @staticmethod
-    def _is_cycle(e, G):
-        cycles = []
-        path = []
+    def min_degree(self):
+        return 2
 
-        def visit(v):
-            path.append(v)
-            for u in [edge[1] for edge in G.edges(v) if edge[1] in e]:
-                if u == path[0]:
-                    cycles.append(copy.deepcopy(path))
-                elif u not in path:
-                    visit(u)
-            path.remove(v)
-
-        visit(e[0])
-
-        for cycle in cycles:
-            if len(cycle) == len(e):
-                return True
+    def process(self, e, G):
+        if len(e) > 2 and patterns.is_hamiltonian(self._masks(e, G)) and self.anchored(e):
+            self._inc_found(e)
+            if self.out.enabled:
+                self._found(e, G, tpe='%d-cycle' % len(e))
 
 
 class ExampleTree(Algorithm):
     def __init__(self, out, max):
-        super().__init__(out, 5 if max > 5 else max)
+        super().__init__(out, 5 if max is None or max > 5 else max)
 
     def filter(self, e, G, last_v):
         super()._inc_filter()
@@ -112,7 +164,7 @@ class ExampleTree(Algorithm):
             return True
         elif len(e) == self.max:
             for u in e:
-                neighbors = [edge[1] for edge in G.edges(u) if edge[1] in e]
+                neighbors = [v for v in G.neighbors(u) if v in e]
                 if len(neighbors) == 3:
                     w = [v for v in e if v != u and v not in neighbors][0]  # non neighbor
                     for v in neighbors:
@@ -127,6 +179,199 @@ class ExampleTree(Algorithm):
         return False
 
     def process(self, e, G):
-        if len(e) == self.max:
-            self._inc_found()
-            self.out.found(e, G, tpe='tree')
+        if len(e) == self.max and self.anchored(e):
+            self._inc_found(e)
+            if self.out.enabled:
+                self._found(e, G, tpe='tree')
+
+
+class MotifCounting(Algorithm):
+    # Counts embeddings per isomorphism class (patterns.canonical_code) of 3
+    # to max vertices; individual embeddings are never output. During an
+    # update, an embedding through the updated edges moves from the class it
+    # had without them to the class it has with them; the resulting changes
+    # are collected in deltas and output when the update ends.
+
+    def __init__(self, out, max=math.inf):
+        super().__init__(out, max)
+        self.counts = {}
+        self.deltas = {}
+        self.update_index = None
+
+    def process(self, e, G):
+        if len(e) < 3 or not self.anchored(e):
+            return
+        self._inc_found(e)
+        masks = self._masks(e, G)
+        if self.update_index is None:
+            code = patterns.canonical_code(masks)
+            self.counts[code] = self.counts.get(code, 0) + 1
+            return
+
+        self._count(patterns.canonical_code(masks), self.sign)
+        other = list(masks)  # the embedding on the other side of the update
+        position = {v: i for i, v in enumerate(e)}
+        for i, v in enumerate(e):
+            for u in self.update_index.get(v, ()):
+                j = position.get(u)
+                if j is not None:
+                    other[i] &= ~(1 << j)
+        other = tuple(other)
+        if patterns.is_connected(other):
+            self._count(patterns.canonical_code(other), -self.sign)
+
+    def _count(self, code, delta):
+        self.counts[code] = self.counts.get(code, 0) + delta
+        self.deltas[code] = self.deltas.get(code, 0) + delta
+
+    def begin_update(self, edges, sign=1):
+        super().begin_update(edges, sign)
+        self.update_index = {}
+        for edge in edges:
+            self.update_index.setdefault(edge[0], set()).add(edge[1])
+            self.update_index.setdefault(edge[1], set()).add(edge[0])
+
+    def end_update(self):
+        super().end_update()
+        self.update_index = None
+        for code, delta in sorted(self.deltas.items()):
+            if delta != 0 and self.out.enabled:
+                self.out.counted(patterns.code_name(code), delta)
+        self.deltas = {}
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.counts = {}
+        self.deltas = {}
+
+    def merge(self, other):
+        super().merge(other)
+        for code, count in other.counts.items():
+            self.counts[code] = self.counts.get(code, 0) + count
+        for code, delta in other.deltas.items():
+            self.deltas[code] = self.deltas.get(code, 0) + delta
+
+    def finish(self):
+        # the static histogram, one count per class
+        if self.out.enabled:
+            for name, count in self.summary():
+                self.out.counted(name, count)
+
+    def summary(self):
+        return [(patterns.code_name(code), count) for code, count in sorted(self.counts.items()) if count != 0]
+
+
+class Composite(Algorithm):
+    # Several algorithms (name -> Algorithm) on one exploration: the
+    # canonicality checks and extensions run once for all of them. An
+    # embedding is extended while the filter of any member accepts it, and
+    # each member only filters and processes the embeddings its own filter
+    # accepted all the way, so it finds the same matches as on its own. The
+    # members keep their counters; num_found is their total, num_filters
+    # counts the shared filter calls. out and labels are the members', and
+    # values several members compute from an embedding (_masks) are shared.
+
+    def __init__(self, algorithms):
+        self.algorithms = dict(algorithms)
+        self.accepted = {}  # embedding size -> members that accepted the embedding
+        members = list(self.algorithms.values())
+        super().__init__(members[0].out, max(alg.max for alg in members))
+        self.shared = {}
+
+    @property
+    def out(self):
+        return next(iter(self.algorithms.values())).out
+
+    @out.setter
+    def out(self, out):
+        for alg in self.algorithms.values():
+            alg.out = out
+
+    @property
+    def labels(self):
+        return next(iter(self.algorithms.values())).labels
+
+    @labels.setter
+    def labels(self, labels):
+        for alg in self.algorithms.values():
+            alg.labels = labels
+
+    def filter(self, e, G, last_v):
+        super()._inc_filter()
+        # embeddings the explorers start from are never filtered: all accept them
+        n = len(e)
+        accepted = [alg for alg in self.accepted.get(n - 1, self.algorithms.values())
+                    if n <= alg.max and alg.filter(e, G, last_v)]
+        self.accepted[n] = accepted
+        return len(accepted) > 0
+
+    def min_degree(self):
+        return min(alg.min_degree() for alg in self.algorithms.values())
+
+    def prefix_state(self, e):
+        # names of the members that accepted each prefix of e
+        return {n: [name for name, alg in self.algorithms.items() if alg in self.accepted[n]]
+                for n in range(2, len(e) + 1)}
+
+    def resume(self, e, state):
+        self.accepted = {n: [self.algorithms[name] for name in names] for n, names in state.items()}
+
+    def process(self, e, G):
+        # the members share values computed from e for this call only: the
+        # graph can change before e is processed again, and members can
+        # also run on their own
+        members = self.accepted.get(len(e), ())
+        for alg in members:
+            alg.shared = self.shared
+        try:
+            for alg in members:
+                found = alg.num_found
+                alg.process(e, G)
+                if alg.num_found != found:
+                    self._inc_found(e)
+        finally:
+            self.shared.clear()
+            for alg in members:
+                alg.shared = None
+
+    def begin_update(self, edges, sign=1):
+        super().begin_update(edges, sign)
+        self.accepted = {}  # explorations from edges start at size 2
+        for alg in self.algorithms.values():
+            alg.begin_update(edges, sign)
+
+    def end_update(self):
+        super().end_update()
+        for alg in self.algorithms.values():
+            alg.end_update()
+
+    def finish(self):
+        for alg in self.algorithms.values():
+            alg.finish()
+
+    def reset_stats(self):
+        super().reset_stats()
+        for alg in self.algorithms.values():
+            alg.reset_stats()
+
+    def merge(self, other):
+        super().merge(other)
+        for name, alg in self.algorithms.items():
+            alg.merge(other.algorithms[name])
+
+
+def create(name, out, max=None, min=None):
+    # algorithm selected by its command line name, several separated by
+    # commas running as a Composite; min only applies to cliques
+    if ',' in name:
+        return Composite({part: create(part, out, max, min) for part in name.split(',')})
+    elif name == 'clique':
+        return CliqueFinding(out, max, min=min)
+    elif name == 'cycle':
+        return CycleFinding(out, max)
+    elif name == 'motif':
+        return MotifCounting(out, max)
+    elif name.startswith('example'):
+        return ExampleTree(out, max)
+    else:
+        return Algorithm(out, max)
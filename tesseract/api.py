@@ -0,0 +1,189 @@
+import functools
+import queue
+import threading
+from collections import namedtuple
+from timeit import default_timer as timer
+
+from tesseract import algorithms, cliques, io, mining
+from tesseract.embedding import Embedding
+
+
+# Library entry point: iter_matches yields matches as the exploration finds
+# them instead of pushing them through an output. The explorers of mining.py
+# run in a thread and hand their matches to the consumer through a bounded
+# queue (see _Collector): the exploration waits while the consumer does not
+# ask for more, and stops at its next match or root once it stops asking.
+
+# vertices are the ids of the input file (see CSRGraph.original_ids), sign is
+# -1 for matches lost by an edge removal
+Match = namedtuple('Match', ['vertices', 'type', 'sign'])
+
+# last item of the queue, with the exception that ended the exploration
+_End = namedtuple('_End', ['error'])
+
+_POLL = 0.05  # seconds between checks of a closed consumer while the queue is full
+
+
+class _Stop(Exception):
+    pass
+
+
+class _Collector(io.Output):
+    # Queue of at most buffer matches between the exploration thread and the
+    # consumer. Raises _Stop out of the explorer once the consumer is gone,
+    # all the matches wanted were queued or the deadline has passed.
+
+    def __init__(self, deadline, room=None, buffer=256):
+        self.queue = queue.Queue(max(1, buffer))  # 0 would be unbounded
+        self.deadline = deadline
+        self.room = room  # matches still wanted, None: no limit
+        self.closed = False  # set by the consumer
+
+    def found(self, e, G, tpe=None):
+        self._add(Match(G.original_ids(e), tpe, 1))
+
+    def lost(self, e, G, tpe=None):
+        self._add(Match(G.original_ids(e), tpe, -1))
+
+    def _add(self, match):
+        if self.stopped():
+            raise _Stop()
+        self._put(match)
+        if self.room is not None:
+            self.room -= 1
+            if self.room == 0:
+                raise _Stop()
+
+    def _put(self, item):
+        while not self.closed:
+            try:
+                self.queue.put(item, timeout=_POLL)
+                return
+            except queue.Full:
+                pass
+        raise _Stop()
+
+    def end(self, error=None):
+        try:
+            self._put(_End(error))
+        except _Stop:
+            pass  # nobody is listening
+
+    def stopped(self):
+        return self.closed or self.room == 0 or self.deadline.check()
+
+
+class _Deadline:
+    def __init__(self, time_budget):
+        self.end = timer() + time_budget if time_budget is not None else None
+        self.passed = False
+
+    def check(self):
+        if self.end is not None and not self.passed:
+            self.passed = timer() > self.end
+        return self.passed
+
+
+def _static(G, alg, collector):
+    G, roots = mining.prune(G, alg)
+    index = cliques.CliqueIndex(G) if mining.uses_clique_engine(alg) else None
+    for v in roots:
+        if collector.stopped():
+            return
+        if index is not None:
+            cliques.clique_explore_root(G, alg, index, v)
+        else:
+            mining.forwards_explore(G, alg, Embedding(G, [v]))
+    alg.finish()
+
+
+def _dynamic(G, alg, updates, batch_size, collector):
+    # same grouping as mining.middleout_explore_updates
+    run, op = [], mining.ADD
+    for update in updates:
+        if run and (mining.update_op(update) != op or len(run) == batch_size):
+            _run(G, alg, run, op, collector)
+            run = []
+        op = mining.update_op(update)
+        run.append(update)
+    if run:
+        _run(G, alg, run, op, collector)
+
+
+def _run(G, alg, run, op, collector):
+    if op == mining.REMOVE:
+        batch = mining.removal_batch(G, run)
+        alg.begin_update(batch.edges, sign=-1)
+    else:
+        batch = mining.apply_batch(G, run)
+        alg.begin_update(batch.edges)
+    try:
+        for i in range(len(batch)):
+            if collector.stopped():
+                raise _Stop()
+            mining.middleout_explore_batch_edge(G, alg, batch, i)
+    finally:
+        # also when the consumer stops early: the whole batch is applied,
+        # including edges not explored yet (see iter_matches)
+        alg.end_update()
+        if op == mining.REMOVE:
+            for u, v in batch.edges:
+                G.remove_edge(u, v)
+
+
+def _explore(explore, collector):
+    # body of the exploration thread
+    try:
+        explore()
+    except _Stop:
+        pass
+    except BaseException as error:
+        collector.end(error)
+        return
+    collector.end()
+
+
+def _collecting(alg, collector, explore):
+    out, alg.out = alg.out, collector
+    thread = threading.Thread(target=_explore, args=(explore, collector), daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = collector.queue.get()
+            if isinstance(item, _End):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        collector.closed = True
+        thread.join()
+        alg.out = out
+
+
+def iter_matches(graph, algorithm, mode='static', updates=None, limit=None, time_budget=None,
+                 batch_size=1, max=None, buffer=256):
+    # Yields the Match of every embedding the algorithm accepts:
+    #  - mode 'static': forwards exploration from every vertex of graph
+    #  - mode 'dynamic': middle-out exploration of updates ([u, v] or
+    #    [u, v, op], see mining.update_op) applied to graph, which must be
+    #    a DynamicGraph, in batches of up to batch_size
+    # algorithm is an algorithms.Algorithm or a name for algorithms.create.
+    # Stops after limit matches, once time_budget seconds have passed, or
+    # when the consumer stops iterating. Algorithms that only aggregate
+    # (MotifCounting) yield nothing; read their counts after the loop.
+    # The exploration runs at most buffer matches ahead of the consumer, in
+    # a thread, so graph must not be changed while iterating. Stopping in
+    # the middle of a dynamic batch still applies all of it: matches through
+    # its edges not explored yet are never reported.
+    if isinstance(algorithm, str):
+        algorithm = algorithms.create(algorithm, io.NullOutput(), max)
+    collector = _Collector(_Deadline(time_budget), limit, buffer)
+    if mode == 'static':
+        explore = functools.partial(_static, graph, algorithm, collector)
+    elif mode == 'dynamic':
+        mining.track_cores(graph, algorithm)
+        explore = functools.partial(_dynamic, graph, algorithm, updates or [], batch_size, collector)
+    else:
+        raise ValueError('unknown mode \'%s\'' % mode)
+    return _collecting(algorithm, collector, explore)
@@ -1,6 +1,4 @@
-import networkx as nx
-
-from tesseract import graph
+from tesseract import patterns
 
 
 def canonical_r1_all(e):
@@ -47,20 +45,26 @@ def canonical(e, v, G, ignore=[]):
     return canonical_r1(e, v) and canonical_r2(e, v, G, ignore=ignore)
 
 
+def canonical_r2_embedding(s, v, ignore=[]):
+    # same rule as canonical_r2, but the first neighbor of v is kept by the
+    # embedding state instead of being searched with has_edge
+    e = s.vertices
+    for i in range(s.first[v] + 1, len(e)):
+        u = e[i]
+        if u > v and u not in ignore:
+            return False
+    return True
+
+
+def canonical_embedding(s, v, ignore=[]):
+    return s.vertices[0] < v and canonical_r2_embedding(s, v, ignore=ignore)
+
+
 def canonicalize(e, G):
+    # Only looks at the edges between the vertices of e, see
+    # patterns.canonical_order
     if len(e) <= 1:
         return e
     else:
         e = sorted(e)
-        e_c = [e[0]]
-        e = e[1:]
-
-        while len(e) > 0:
-            V = graph.neighborhood(e_c, G)
-            for i, u in enumerate(e):
-                if u in V:
-                    e_c.append(u)
-                    e.pop(i)
-                    break
-
-        return e_c
+        return [e[i] for i in patterns.canonical_order(patterns.adjacency_masks(e, G))]
@@ -0,0 +1,90 @@
+from tesseract import graph
+
+
+# Clique engine used for CliqueFinding instead of the generic explore-then-
+# filter loop: embeddings are only ever extended by common neighbors of all
+# their members, so every extension is a clique and nothing is filtered out.
+# Cliques are reported with their vertices in the order the generic
+# explorers produce: increasing for static mining, the new edge followed by
+# the other vertices in increasing order for middle-out updates.
+
+
+class CliqueIndex:
+    # Edges oriented along a degeneracy order: each vertex keeps the set of
+    # its neighbors that come later, which has at most core number elements,
+    # so every clique is listed exactly once from its earliest vertex.
+
+    def __init__(self, G):
+        order, _ = graph.core_decomposition(G)
+        rank = [0] * len(order)
+        for i, v in enumerate(order):
+            rank[v] = i
+        self.later = [{u for u in G.neighbors(v) if rank[u] > rank[v]} for v in range(len(order))]
+
+    def root_cost(self, v):
+        d = len(self.later[v])
+        return d * d
+
+
+def _extend(G, alg, c, candidates, later):
+    if alg.stats is not None:
+        alg.stats.candidates[alg.stats.reach(len(c) + 1)] += len(candidates)
+    for w in candidates:
+        c.append(w)
+        if len(c) >= alg.min:
+            alg.process(sorted(c), G)
+        if len(c) < alg.max:
+            common = candidates & later[w]
+            if common:
+                _extend(G, alg, c, common, later)
+        c.pop()
+
+
+def clique_explore_root(G, alg, index, v):
+    if alg.max > 1:
+        _extend(G, alg, [v], index.later[v], index.later)
+
+
+def clique_explore_all(G, alg, index=None, roots=None):
+    index = index if index is not None else CliqueIndex(G)
+    stats = alg.stats
+    for v in roots if roots is not None else G.nodes:
+        if stats is not None:
+            stats.begin(v)
+        clique_explore_root(G, alg, index, v)
+        if stats is not None:
+            stats.end()
+
+
+def _extend_update(G, alg, c, candidates, members, batch, position):
+    # candidates are sorted and adjacent to every vertex of c
+    stats = alg.stats
+    if stats is not None:
+        depth = stats.reach(len(c) + 1)
+        stats.candidates[depth] += len(candidates)
+    for i, w in enumerate(candidates):
+        if batch is not None and batch.brings_earlier(members, w, position):
+            if stats is not None:
+                stats.rejected_batch[depth] += 1
+            continue
+        c.append(w)
+        members.add(w)
+        alg.process(c, G)
+        if len(c) < alg.max:
+            common = [x for x in candidates[i + 1:] if G.has_edge(w, x)]
+            if common:
+                _extend_update(G, alg, c, common, members, batch, position)
+        members.discard(w)
+        c.pop()
+
+
+def clique_explore_update(G, alg, edge, batch=None, position=0):
+    # The new cliques are the cliques of the common neighborhood of the edge,
+    # extended by the edge itself.
+    a, b = edge[0], edge[1]
+    if alg.max <= 2:
+        return
+    if G.degree(a) > G.degree(b):
+        a, b = b, a
+    candidates = sorted(u for u in G.neighbors(a) if u != b and G.has_edge(b, u))
+    _extend_update(G, alg, [edge[0], edge[1]], candidates, {a, b}, batch, position)
@@ -0,0 +1,53 @@
+class Embedding:
+    # Exploration state for an embedding grown one vertex at a time. Pushing v
+    # only looks at v's neighbors, popping undoes exactly that, so the
+    # extension set never has to be rebuilt from the whole embedding.
+
+    def __init__(self, G, vertices=()):
+        self.G = G
+        self.vertices = []
+        self.members = set()
+        self.count = {}  # vertex -> number of embedding members adjacent to it
+        self.first = {}  # vertex -> position of its first neighbor in the embedding
+        for v in vertices:
+            self.push(v)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __contains__(self, v):
+        return v in self.members
+
+    def push(self, v, extend=True):
+        # extend=False is for leaves of the exploration tree: nobody asks for
+        # their extensions, so the neighbor bookkeeping can be skipped
+        pos = len(self.vertices)
+        self.vertices.append(v)
+        if not extend:
+            return
+        self.members.add(v)
+        count, first = self.count, self.first
+        for u in self.G.neighbors(v):
+            n = count.get(u, 0)
+            if n == 0:
+                first[u] = pos
+            count[u] = n + 1
+
+    def pop(self, extend=True):
+        v = self.vertices.pop()
+        if not extend:
+            return v
+        self.members.discard(v)
+        count, first = self.count, self.first
+        for u in self.G.neighbors(v):
+            n = count[u] - 1
+            if n == 0:
+                del count[u]
+                del first[u]
+            else:
+                count[u] = n
+        return v
+
+    def extensions(self):
+        members = self.members
+        return [u for u in self.count if u not in members]
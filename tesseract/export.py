@@ -0,0 +1,120 @@
+import heapq
+import logging
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # sorted_edge_runs falls back to pure Python
+    np = None
+
+from tesseract import utils
+
+
+LOG = logging.getLogger('EXPT')
+
+# Adjacency of the graph as MongoDB documents, one per vertex with at least
+# one larger neighbor: {'_id': str(v), 'neighbors': {str(u): {'ts': str(ts)}}}
+# (edges are oriented from the smaller to the larger vertex). Edges are
+# packed into sorted uint64 runs of chunk_size and merged, so only the
+# packed edges are ever in memory, and vertices without edges cost nothing.
+
+DUPLICATE_KEY = 11000
+
+
+def sorted_edge_runs(src, dst, min_vertex=0, max_vertex=1 << 32, chunk_size=1 << 22):
+    # Yields the oriented edges with min_vertex <= source < max_vertex,
+    # packed as source << 32 | target, in sorted runs: one per chunk_size
+    # edges, each sorted on its own so only one chunk is ever unpacked.
+    sort_run = _sorted_run_numpy if np is not None else _sorted_run
+    for start in range(0, len(src), chunk_size):
+        yield sort_run(src[start:start + chunk_size], dst[start:start + chunk_size], min_vertex, max_vertex)
+
+
+def _sorted_run(src, dst, min_vertex, max_vertex):
+    run = array('Q')
+    for u, v in zip(src, dst):
+        if u > v:
+            u, v = v, u
+        if u != v and min_vertex <= u < max_vertex:
+            run.append(u << 32 | v)
+    return array('Q', sorted(run))
+
+
+def _sorted_run_numpy(src, dst, min_vertex, max_vertex):
+    src, dst = np.asarray(src, dtype=np.uint64), np.asarray(dst, dtype=np.uint64)
+    u, v = np.minimum(src, dst), np.maximum(src, dst)
+    keep = (u != v) & (u >= min_vertex) & (u < max_vertex)
+    keys = (u[keep] << np.uint64(32)) | v[keep]
+    keys.sort()
+    return array('Q', keys.tobytes())
+
+
+def adjacency(runs, after=None):
+    # Yields (v, sorted distinct larger neighbors) in increasing v, skipping
+    # the vertices up to after (the last one written by a previous export).
+    current, neighbors = None, []
+    for key in heapq.merge(*runs):
+        u, v = key >> 32, key & 0xffffffff
+        if after is not None and u <= after:
+            continue
+        if u != current:
+            if current is not None:
+                yield current, neighbors
+            current, neighbors = u, []
+        if not neighbors or neighbors[-1] != v:
+            neighbors.append(v)
+    if current is not None:
+        yield current, neighbors
+
+
+def documents(adjacency, timestamps=None):
+    timestamps = timestamps if timestamps is not None else utils.AutoTimestamp()
+    for v, neighbors in adjacency:
+        yield {'_id': str(v), 'neighbors': {str(u): {'ts': str(timestamps.timestamp())} for u in neighbors}}
+
+
+def last_written(progress, name):
+    # vertex id the last export of name got to, None if it never wrote any
+    state = progress.find_one({'_id': name}) if progress is not None else None
+    return state['last_vertex'] if state is not None else None
+
+
+def write(collection, documents, batch_size=1000, progress=None, name=None):
+    # Writes the documents with unordered insert_many batches and returns
+    # the number written. After each batch, the progress collection (if
+    # any) records its last vertex for name, see last_written. Documents
+    # already there (a batch cut short by a crash) are skipped.
+    written, batch = 0, []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            written += _write_batch(collection, batch, progress, name)
+            batch = []
+    if batch:
+        written += _write_batch(collection, batch, progress, name)
+    return written
+
+
+def _write_batch(collection, batch, progress, name):
+    try:
+        collection.insert_many(batch, ordered=False)
+    except Exception as error:
+        # pymongo's BulkWriteError, without importing pymongo here
+        details = getattr(error, 'details', None)
+        if details is None or any(e.get('code') != DUPLICATE_KEY for e in details.get('writeErrors', ())):
+            raise
+        LOG.debug('Skipped %d documents already written' % len(details['writeErrors']))
+    if progress is not None:
+        progress.replace_one({'_id': name}, {'_id': name, 'last_vertex': int(batch[-1]['_id'])}, upsert=True)
+    return len(batch)
+
+
+def export(src, dst, collection, min_vertex=0, max_vertex=1 << 32, batch_size=1000, chunk_size=1 << 22,
+           progress=None, name=None):
+    # Exports the graph of edges src[i]-dst[i]; with a progress collection,
+    # an interrupted export of name resumes after its last written vertex.
+    after = last_written(progress, name)
+    if after is not None:
+        LOG.info('Resuming after vertex %d' % after)
+    runs = sorted_edge_runs(src, dst, min_vertex, max_vertex, chunk_size)
+    return write(collection, documents(adjacency(runs, after)), batch_size, progress, name)
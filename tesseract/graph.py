@@ -1,8 +1,525 @@
-import networkx as nx
+import math
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # from_edges and multi_source_bfs fall back to pure Python
+    np = None
+
+
+class CSRGraph:
+    # Read-optimised undirected graph: the neighbors of v are the sorted slice
+    # targets[offsets[v]:offsets[v + 1]], so has_edge is a binary search.
+    # offsets/targets can be any indexable int sequence (array, memoryview).
+
+    def __init__(self, offsets, targets, ids=None):
+        self.offsets = offsets
+        self.targets = targets
+        self.ids = ids
+        self.num_vertices = len(offsets) - 1
+
+    @classmethod
+    def from_edges(cls, src, dst, num_vertices=None, relabel=False):
+        # relabel: map the ids of src and dst to 0..n-1 in increasing order
+        # (kept in ids) unless they already are. Duplicates and self-loops
+        # are dropped.
+        if np is not None:
+            return cls._from_edges_numpy(src, dst, num_vertices, relabel)
+        ids = None
+        if relabel:
+            ids = array('I', sorted(set(src) | set(dst)))
+            if len(ids) > 0 and ids[-1] == len(ids) - 1:
+                ids = None  # already dense
+        if ids is not None:
+            rank = {u: i for i, u in enumerate(ids)}
+            src = [rank[u] for u in src]
+            dst = [rank[v] for v in dst]
+            n = len(ids)
+        else:
+            n = max(max(src, default=-1), max(dst, default=-1)) + 1
+        if num_vertices is not None:
+            n = max(n, num_vertices)
+
+        counts = [0] * (n + 1)
+        for u, v in zip(src, dst):
+            if u != v:
+                counts[u + 1] += 1
+                counts[v + 1] += 1
+        for v in range(n):
+            counts[v + 1] += counts[v]
+
+        fill = counts[:-1]
+        unsorted = array('I', bytes(4 * counts[n]))
+        for u, v in zip(src, dst):
+            if u != v:
+                unsorted[fill[u]] = v
+                fill[u] += 1
+                unsorted[fill[v]] = u
+                fill[v] += 1
+
+        offsets = array('Q', [0])
+        targets = array('I')
+        for v in range(n):
+            targets.extend(sorted(set(unsorted[counts[v]:counts[v + 1]])))
+            offsets.append(len(targets))
+        return cls(offsets, targets, ids=ids)
+
+    @classmethod
+    def _from_edges_numpy(cls, src, dst, num_vertices, relabel):
+        # the same arrays without a Python loop over the edges: both
+        # directions packed as u << 32 | v keys, sorted and deduplicated into
+        # the targets, rows counted into the offsets
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        ids = None
+        if relabel:
+            ids, inverse = np.unique(np.concatenate((src, dst)), return_inverse=True)
+            if len(ids) > 0 and ids[-1] == len(ids) - 1:
+                ids = None  # already dense
+            else:
+                src, dst = inverse[:len(src)], inverse[len(src):]
+        if ids is not None:
+            n = len(ids)
+        else:
+            n = int(max(src.max(initial=-1), dst.max(initial=-1))) + 1
+        if num_vertices is not None:
+            n = max(n, num_vertices)
+
+        keep = src != dst
+        sources = np.concatenate((src[keep], dst[keep])).astype(np.uint64)
+        keys = sources << np.uint64(32) | np.concatenate((dst[keep], src[keep])).astype(np.uint64)
+        keys.sort()
+        if len(keys) > 1:
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        offsets = np.zeros(n + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum(np.bincount((keys >> np.uint64(32)).astype(np.int64), minlength=n))
+        targets = (keys & np.uint64(0xffffffff)).astype(np.uint32)
+        if ids is not None:
+            ids = array('I', ids.astype(np.uint32).tobytes())
+        return cls(array('Q', offsets.tobytes()), array('I', targets.tobytes()), ids=ids)
+
+    @classmethod
+    def from_networkx(cls, G):
+        nodes = list(G.nodes)
+        src, dst = [], []
+        for u, v in G.edges:
+            src.append(u)
+            dst.append(v)
+        relabel = len(nodes) > 0 and (min(nodes) < 0 or max(nodes) >= len(nodes))
+        if relabel:
+            # keep isolated vertices: they are still roots of the exploration
+            src.extend(nodes)
+            dst.extend(nodes)
+        return cls.from_edges(src, dst, num_vertices=len(nodes), relabel=relabel)
+
+    @property
+    def nodes(self):
+        return range(self.num_vertices)
+
+    def number_of_nodes(self):
+        return self.num_vertices
+
+    def number_of_edges(self):
+        return self.offsets[self.num_vertices] // 2
+
+    def has_node(self, v):
+        return 0 <= v < self.num_vertices
+
+    def degree(self, v):
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def neighbors(self, v):
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+
+    def has_edge(self, u, v):
+        if not (0 <= u < self.num_vertices):
+            return False
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        i = bisect_left(self.targets, v, lo, hi)
+        return i < hi and self.targets[i] == v
+
+    def edges(self):
+        for u in self.nodes:
+            for v in self.neighbors(u):
+                if u < v:
+                    yield u, v
+
+    def original_ids(self, e):
+        # the vertices of e as the ids of the input file
+        ids = self.ids
+        if ids is None:
+            return list(e)
+        return [ids[v] if v < len(ids) else v for v in e]
+
+
+class DynamicGraph(CSRGraph):
+    # CSR base plus per-vertex delta buffers of added and removed neighbors.
+    # The deltas are merged back into the CSR arrays once they grow past a
+    # fraction of the base edges, so updates never rebuild on every edge.
+
+    def __init__(self, offsets, targets, ids=None, compact_ratio=0.25, min_compact=1 << 16):
+        super().__init__(offsets, targets, ids=ids)
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self._base_vertices = self.num_vertices
+        self._added = {}
+        self._removed = {}
+        self._num_delta = 0
+        self._num_edges = super().number_of_edges()
+        self.cores = None  # see track_cores
+        self.core_cap = 0
+
+    @classmethod
+    def empty(cls, num_vertices=0, ids=None):
+        return cls(array('Q', [0] * (num_vertices + 1)), array('I'), ids=ids)
+
+    def number_of_edges(self):
+        return self._num_edges
+
+    def degree(self, v):
+        return len(self.neighbors(v))
+
+    def _base_has_edge(self, u, v):
+        return u < self._base_vertices and CSRGraph.has_edge(self, u, v)
+
+    def neighbors(self, v):
+        if self._num_delta == 0:
+            return self.targets[self.offsets[v]:self.offsets[v + 1]] if v < self._base_vertices else ()
+        base = self.targets[self.offsets[v]:self.offsets[v + 1]] if v < self._base_vertices else ()
+        removed = self._removed.get(v)
+        if removed:
+            base = [u for u in base if u not in removed]
+        added = self._added.get(v)
+        if added:
+            return list(base) + list(added)
+        return base
+
+    def has_edge(self, u, v):
+        if self._num_delta == 0:
+            return self._base_has_edge(u, v)
+        added = self._added.get(u)
+        if added and v in added:
+            return True
+        removed = self._removed.get(u)
+        if removed and v in removed:
+            return False
+        return self._base_has_edge(u, v)
+
+    def add_node(self, v):
+        if v >= self.num_vertices:
+            if self.cores is not None:
+                self.cores.extend([0] * (v + 1 - self.num_vertices))
+            self.num_vertices = v + 1
+
+    def add_edge(self, u, v):
+        if u == v or self.has_edge(u, v):
+            return
+        self.add_node(max(u, v))
+        for a, b in ((u, v), (v, u)):
+            removed = self._removed.get(a)
+            if removed and b in removed:
+                removed.discard(b)
+                self._num_delta -= 1
+            else:
+                self._added.setdefault(a, set()).add(b)
+                self._num_delta += 1
+        self._num_edges += 1
+        if self.cores is not None:
+            self._raise_cores(u, v)
+        self._maybe_compact()
+
+    def remove_edge(self, u, v):
+        if not self.has_edge(u, v):
+            raise KeyError('edge %d-%d not in graph' % (u, v))
+        for a, b in ((u, v), (v, u)):
+            added = self._added.get(a)
+            if added and b in added:
+                added.discard(b)
+                self._num_delta -= 1
+            else:
+                self._removed.setdefault(a, set()).add(b)
+                self._num_delta += 1
+        self._num_edges -= 1
+        if self.cores is not None:
+            self._lower_cores(u, v)
+        self._maybe_compact()
+
+    def track_cores(self, cap):
+        # From now on, keeps cores[v] = min(core number of v, cap) up to date
+        # through add_edge and remove_edge. Capping bounds the work of an
+        # update: vertices at the cap never have to be raised, and lowering
+        # them only peels the cap-core.
+        _, cores = core_decomposition(self)
+        self.cores = array('I', [min(c, cap) for c in cores])
+        self.core_cap = cap
+
+    def _core_degree(self, v, r):
+        cores = self.cores
+        return sum(1 for u in self.neighbors(v) if cores[u] >= r)
+
+    def _raise_cores(self, u, v):
+        # Subcore algorithm (Sariyuce et al.): only the vertices of core r =
+        # min(core(u), core(v)) connected to the edge through vertices of
+        # core r can go up, by one, and those that keep more than r
+        # neighbors of core >= r among them do.
+        cores = self.cores
+        r = min(cores[u], cores[v])
+        if r >= self.core_cap:
+            return
+        subcore = {w for w in (u, v) if cores[w] == r}
+        stack = list(subcore)
+        while stack:
+            w = stack.pop()
+            for x in self.neighbors(w):
+                if cores[x] == r and x not in subcore:
+                    subcore.add(x)
+                    stack.append(x)
+        degree = {w: self._core_degree(w, r) for w in subcore}
+        evicted = {w for w, d in degree.items() if d <= r}
+        stack = list(evicted)
+        while stack:
+            w = stack.pop()
+            for x in self.neighbors(w):
+                if x in subcore and x not in evicted:
+                    degree[x] -= 1
+                    if degree[x] <= r:
+                        evicted.add(x)
+                        stack.append(x)
+        for w in subcore:
+            if w not in evicted:
+                cores[w] = r + 1
+
+    def _lower_cores(self, u, v):
+        # Peels the r-core from the endpoints of the removed edge, computing
+        # the degree of a vertex in it only once a neighbor left it.
+        cores = self.cores
+        r = min(cores[u], cores[v])
+        if r == 0:
+            return
+        degree = {w: self._core_degree(w, r) for w in (u, v) if cores[w] == r}
+        stack = [w for w, d in degree.items() if d < r]
+        while stack:
+            w = stack.pop()
+            if cores[w] != r:
+                continue
+            cores[w] = r - 1
+            for x in self.neighbors(w):
+                if cores[x] == r:
+                    if x in degree:
+                        degree[x] -= 1
+                    else:
+                        degree[x] = self._core_degree(x, r)
+                    if degree[x] < r:
+                        stack.append(x)
+
+    def _maybe_compact(self):
+        if self._num_delta > max(self.min_compact, self.compact_ratio * len(self.targets)):
+            self.compact()
+
+    def compact(self):
+        if self._num_delta == 0 and self._base_vertices == self.num_vertices:
+            return
+        offsets = array('Q', [0])
+        targets = array('I')
+        for v in self.nodes:
+            targets.extend(sorted(self.neighbors(v)))
+            offsets.append(len(targets))
+        self.offsets, self.targets = offsets, targets
+        self._base_vertices = self.num_vertices
+        self._added = {}
+        self._removed = {}
+        self._num_delta = 0
+
+
+def gnp_random_edges(n, p, seed=None):
+    # Same edges as networkx's fast_gnp_random_graph(n, p, seed) (Batagelj
+    # and Brandes' geometric skipping), without building an nx.Graph.
+    src, dst = array('I'), array('I')
+    if p <= 0:
+        return src, dst
+    if p >= 1:
+        for v in range(n):
+            for w in range(v + 1, n):
+                src.append(v)
+                dst.append(w)
+        return src, dst
+    rng = random.Random(seed)
+    lp = math.log(1.0 - p)
+    v, w = 1, -1
+    while v < n:
+        lr = math.log(1.0 - rng.random())
+        w = w + 1 + int(lr / lp)
+        while w >= v and v < n:
+            w = w - v
+            v = v + 1
+        if v < n:
+            src.append(v)
+            dst.append(w)
+    return src, dst
+
+
+def core_decomposition(G):
+    # Batagelj and Zaversnik's O(m) bucket peeling. Returns the vertices in
+    # degeneracy order (each has the fewest neighbors among the later ones)
+    # and the core number of every vertex.
+    n = G.number_of_nodes()
+    deg = [G.degree(v) for v in range(n)]
+    bins = [0] * (max(deg, default=0) + 1)
+    for d in deg:
+        bins[d] += 1
+    start = 0
+    for d, num in enumerate(bins):
+        bins[d] = start
+        start += num
+    pos, order = [0] * n, [0] * n
+    for v in range(n):
+        pos[v] = bins[deg[v]]
+        order[pos[v]] = v
+        bins[deg[v]] += 1
+    for d in range(len(bins) - 1, 0, -1):
+        bins[d] = bins[d - 1]
+    if bins:
+        bins[0] = 0
+    for i in range(n):
+        v = order[i]
+        for u in G.neighbors(v):
+            if deg[u] > deg[v]:
+                du, pu = deg[u], pos[u]
+                pw = bins[du]
+                w = order[pw]
+                if u != w:
+                    pos[u], order[pu] = pw, w
+                    pos[w], order[pw] = pu, u
+                bins[du] += 1
+                deg[u] -= 1
+    return order, deg
+
+
+def core_subgraph(G, k):
+    # Subgraph induced by the vertices of core number >= k, with the same
+    # vertex ids (the others are left without neighbors). Returns it and its
+    # vertices, or G and G.nodes when no vertex is dropped.
+    if k <= 0:
+        return G, G.nodes
+    if k == 1:
+        vertices = [v for v in G.nodes if G.degree(v) > 0]
+    else:
+        _, cores = core_decomposition(G)
+        vertices = [v for v in G.nodes if cores[v] >= k]
+    if len(vertices) == G.number_of_nodes():
+        return G, G.nodes
+    kept = bytearray(G.number_of_nodes())
+    for v in vertices:
+        kept[v] = 1
+    offsets = array('Q', [0])
+    targets = array('I')
+    for v in G.nodes:
+        if kept[v]:
+            targets.extend(sorted(u for u in G.neighbors(v) if kept[u]))
+        offsets.append(len(targets))
+    return CSRGraph(offsets, targets, ids=G.ids), vertices
+
+
+def multi_source_bfs(G, sources, depth):
+    # Level-synchronous BFS from all sources at once, with one frontier per
+    # level, expanded in one go from the CSR slices of its vertices with
+    # numpy when available. Returns the number of vertices first reached at
+    # each depth (0: the distinct sources) and a bytearray of the visited
+    # vertices.
+    if np is not None:
+        return _multi_source_bfs_numpy(G, sources, depth)
+    visited = bytearray(G.number_of_nodes())
+    frontier = []
+    for v in sources:
+        if not visited[v]:
+            visited[v] = 1
+            frontier.append(v)
+    reached = [len(frontier)]
+    for _ in range(depth):
+        level = []
+        for v in frontier:
+            for u in G.neighbors(v):
+                if not visited[u]:
+                    visited[u] = 1
+                    level.append(u)
+        if not level:
+            break
+        reached.append(len(level))
+        frontier = level
+    return reached, visited
+
+
+def _multi_source_bfs_numpy(G, sources, depth):
+    if isinstance(G, DynamicGraph):
+        G.compact()  # the expansion reads the CSR arrays
+    offsets, targets = np.asarray(G.offsets), np.asarray(G.targets)
+    visited = np.zeros(G.number_of_nodes(), dtype=np.uint8)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    visited[frontier] = 1
+    reached = [len(frontier)]
+    for _ in range(depth):
+        starts = offsets[frontier].astype(np.int64)
+        lengths = offsets[frontier + 1].astype(np.int64) - starts
+        # positions of all the frontier's neighbors in targets: each slice
+        # start repeated over its length, plus a running index
+        ends = np.cumsum(lengths)
+        positions = np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+        neighbors = targets[positions]
+        level = np.unique(neighbors[visited[neighbors] == 0])
+        if len(level) == 0:
+            break
+        visited[level] = 1
+        reached.append(len(level))
+        frontier = level.astype(np.int64)
+    return reached, bytearray(visited.tobytes())
+
+
+def sample_edge_endpoints(G, fraction, seed=None):
+    # Endpoints of a sample of the edges, each kept with probability
+    # fraction. Skips geometrically over the adjacency entries, so the cost
+    # is in the number of sampled edges rather than of all edges; entry
+    # (u, v) only counts for u < v, so every edge has exactly one chance.
+    if isinstance(G, DynamicGraph):
+        G.compact()  # the skipping indexes the CSR arrays
+    if fraction >= 1:
+        return [v for v in G.nodes if G.degree(v) > 0]
+    endpoints = []
+    if fraction <= 0:
+        return endpoints
+    rng = random.Random(seed)
+    lp = math.log(1.0 - fraction)
+    n, offsets = G.number_of_nodes(), G.offsets
+    total = offsets[n]
+    i = -1
+    while True:
+        i += 1 + int(math.log(1.0 - rng.random()) / lp)
+        if i >= total:
+            break
+        u = bisect_right(offsets, i, 0, n + 1) - 1
+        v = G.targets[i]
+        if u < v:
+            endpoints.append(u)
+            endpoints.append(v)
+    return endpoints
+
+
+def neighborhood_coverage(G, depth, fraction=1.0, seed=None):
+    # Fraction of the vertices within depth hops of the endpoints of a
+    # fraction of the edges (all of them by default), for each depth up to
+    # depth: an estimate of how much of the graph updates touch.
+    n = G.number_of_nodes()
+    reached, _ = multi_source_bfs(G, sample_edge_endpoints(G, fraction, seed), depth)
+    coverage, total = [], 0
+    for count in reached:
+        total += count
+        coverage.append(total / n if n > 0 else 0.0)
+    coverage.extend([coverage[-1]] * (depth + 1 - len(coverage)))
+    return coverage
 
 
 def neighborhood(e, G):
-    return {edge[1] for edge in G.edges(e)}
+    return {u for v in e for u in G.neighbors(v)}
 
 
 def is_connected(v, e, G):
@@ -1,53 +1,417 @@
 import logging
+import mmap
+import os
+import re
+import shutil
 import struct
+import threading
+import zlib
+from array import array
+from queue import Queue
 
-from tesseract import canonical
+try:
+    import numpy as np
+except ImportError:  # text edge lists are parsed in pure Python
+    np = None
+
+from tesseract import canonical, patterns
+
+
+def read_xsc_edges(path):
+    # Memory-maps the file as native uint32 (source, target) pairs and returns
+    # two strided views over it, so no edge is copied or unpacked in Python.
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        size -= size % 8
+        if size == 0:
+            return array('I'), array('I')
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    edges = memoryview(data)[:size].cast('I')
+    return edges[0::2], edges[1::2]
 
 
 def read_xsc_graph(path):
-    with open(path,'rb') as file:
-        try:
-            for chunk in iter((lambda:file.read(8)), ''):
-                source = struct.unpack('I', chunk[0:4])[0]
-                target = struct.unpack('I', chunk[4:8])[0]
-                yield (source, target)
-        except:
-            pass
+    src, dst = read_xsc_edges(path)
+    yield from zip(src, dst)
+
+
+_TXT_PAIRS = re.compile(rb'(?:[ \t]*\d+[ \t]+\d+[ \t]*\r?\n)*')
+_ID_RANGE_ERROR = 'vertex ids of edge lists must be between 0 and %d' % 0xffffffff
+
+
+def _parse_txt_chunk(chunk, src, dst):
+    # ValueError for ids that do not fit the uint32 arrays, on every path
+    plain = _TXT_PAIRS.fullmatch(chunk) is not None  # only "source target" lines
+    if plain and np is not None:
+        # convert the chunk at once
+        values = np.fromstring(chunk, dtype=np.int64, sep=' ')  # saturates beyond int64
+        if values.max(initial=0) > 0xffffffff:
+            raise ValueError(_ID_RANGE_ERROR)
+        values = values.astype(np.uint32)
+        src.frombytes(values[0::2].tobytes())
+        dst.frombytes(values[1::2].tobytes())
+        return
+    try:
+        if plain:
+            values = array('I', map(int, chunk.split()))
+            src.extend(values[0::2])
+            dst.extend(values[1::2])
+        else:
+            for line in chunk.splitlines():
+                data = line.split()
+                if len(data) == 2 and not data[0].startswith(b'#'):
+                    src.append(int(data[0]))
+                    dst.append(int(data[1]))
+    except OverflowError:
+        raise ValueError(_ID_RANGE_ERROR)
+
+
+def read_txt_edges(path, chunk_size=1 << 24):
+    # Parses a SNAP-style edge list in large chunks into uint32 arrays; lines
+    # starting with '#' and lines without exactly two fields are skipped.
+    src, dst = array('I'), array('I')
+    with open(path, 'rb') as file:
+        tail = b''
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            chunk = tail + chunk
+            end = chunk.rfind(b'\n') + 1
+            tail = chunk[end:]
+            if end > 0:
+                _parse_txt_chunk(chunk[:end], src, dst)
+        if tail.strip():
+            _parse_txt_chunk(tail + b'\n', src, dst)
+    return src, dst
+
 
 def read_txt_graph(path):
-    with open(path,'r') as file:
-        for line in file:
-            data = line.strip().split(' ')
-            
-            #print(data)
-            if len(data) > 0:
-                if data[0] == '#':
-                    pass
-                elif len(data) == 2:
-                    data = line.strip().split(' ')
-                    source = int(data[0])
-                    target = int(data[1])
-
-                    yield(source ,target)
-
-
-class PatternOutput:
-    def __init__(self, file=None, canonicalize=True, sort=False, log_patterns=False):
+    src, dst = read_txt_edges(path)
+    yield from zip(src, dst)
+
+
+class Output:
+    # Sink the algorithms report patterns to. When enabled is False the
+    # algorithms skip found/lost/counted altogether and only their counters
+    # (num_found, MotifCounting.counts) are kept.
+    enabled = True
+
+    def found(self, e, G, tpe=None):
+        pass
+
+    def lost(self, e, G, tpe=None):
+        pass
+
+    def counted(self, tpe, delta):
+        pass
+
+    def worker(self, i):
+        # output for worker i of a parallel run, merged back with merge
+        return self
+
+    def merge(self, other):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullOutput(Output):
+    # count-only runs: no per-pattern work at all
+    enabled = False
+
+
+class PatternOutput(Output):
+    def __init__(self, file=None, canonicalize=True, sort=False, log_patterns=False, codes=False):
         self.file = file
         self.canonicalize = canonicalize
         self.sort = sort
         self.log_patterns = log_patterns
+        self.codes = codes
         self.log = logging.getLogger('OUTP')
 
     def found(self, e, G, tpe=None):
-        if self.file is not None or self.log_patterns is not None:
-            if self.canonicalize:
-                e = canonical.canonicalize(e, G)
-            elif self.sort:
-                e = sorted(e)
+        self._write(e, G, tpe, '', 'Found')
+
+    def lost(self, e, G, tpe=None):
+        # a match destroyed by an edge removal, written with a '-' prefix
+        self._write(e, G, tpe, '-', 'Lost')
+
+    def counted(self, tpe, delta):
+        # change in the number of embeddings of a pattern, see MotifCounting
+        if self.file is not None:
+            self.file.write('%s %+d\n' % (tpe, delta))
+
+        if self.log_patterns:
+            self.log.info('Count %s %+d' % (tpe, delta))
+
+    def _write(self, e, G, tpe, prefix, verb):
+        if self.file is not None or self.log_patterns:
+            e, code = self._prepare(e, G)
+            code = ' ' + code if code is not None else ''
 
             if self.file is not None:
-                self.file.write('%s\n' % str(e))
+                self.file.write('%s%s%s\n' % (prefix, str(e), code))
 
             if self.log_patterns:
-                self.log.info('Found %s: %s' % (tpe, str(e)))
+                self.log.info('%s %s: %s%s' % (verb, tpe, str(e), code))
+
+    def _prepare(self, e, G):
+        # the vertices as they are output, and the pattern's code if asked for
+        if self.canonicalize:
+            e = canonical.canonicalize(e, G)
+        elif self.sort:
+            e = sorted(e)
+
+        code = None
+        if self.codes:
+            code = patterns.code_name(patterns.canonical_code(patterns.adjacency_masks(e, G)))
+
+        if G.ids is not None:
+            e = G.original_ids(e)
+        return e, code
+
+    def worker(self, i):
+        # output for worker i, written next to the main file and merged back
+        file = open('%s.part%d' % (self.file.name, i), 'w') if self.file is not None else None
+        return PatternOutput(file, self.canonicalize, self.sort, log_patterns=self.log_patterns, codes=self.codes)
+
+    def merge(self, other):
+        if self.file is not None and other.file is not None:
+            with open(other.file, 'r') as part:
+                shutil.copyfileobj(part, self.file)
+            os.remove(other.file)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def __getstate__(self):
+        # a closed worker output travels back to the parent by file name
+        state = self.__dict__.copy()
+        if self.file is not None:
+            state['file'] = self.file.name
+        return state
+
+
+# Binary pattern files: MAGIC, a little-endian uint32 of flags, then records
+# (zlib-compressed if FLAG_ZLIB is set). Every record starts with a uint16
+# tag and a uint16 size:
+#  - tag 0 defines the next tag: size bytes of UTF-8 pattern type follow
+#  - found/lost patterns: size is k | FOUND or LOST, k uint32 vertex ids follow
+#  - counted patterns: size is COUNT, an int64 delta follows
+PATTERNS_MAGIC = b'TSNPPAT1'
+FLAG_ZLIB = 1
+FOUND = 0x0000
+LOST = 0x8000
+COUNT = 0x4000
+KIND = 0xc000
+
+_HEADER = struct.Struct('<I')
+_RECORD = struct.Struct('<HH')
+_DELTA = struct.Struct('<q')
+_ids_structs = {}
+
+
+def _ids_struct(k):
+    if k not in _ids_structs:
+        _ids_structs[k] = struct.Struct('<HH%dI' % k)
+    return _ids_structs[k]
+
+
+class BinaryPatternOutput(PatternOutput):
+    # Writes records into preallocated buffers; full buffers are handed to a
+    # writer thread (which also does the compression) while mining carries on
+    # with the next one. Read the file back with read_patterns.
+
+    def __init__(self, path, canonicalize=True, sort=False, log_patterns=False, codes=False,
+                 compress=False, buffer_size=1 << 20, num_buffers=4):
+        super().__init__(None, canonicalize, sort, log_patterns=log_patterns, codes=codes)
+        self.path = path
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.num_buffers = num_buffers
+        self.tags = {}
+
+        self._free = Queue()
+        for _ in range(num_buffers):
+            self._free.put(bytearray(buffer_size))
+        self._full = Queue()
+        self._buffer = self._free.get()
+        self._pos = 0
+        self._error = None  # what stopped the writer thread
+        file = open(path, 'wb')
+        self._writer = threading.Thread(target=self._write_buffers,
+                                        args=(file, zlib.compressobj() if compress else None), daemon=True)
+        self._writer.start()
+
+    def found(self, e, G, tpe=None):
+        self._write_binary(e, G, tpe, FOUND, 'Found')
+
+    def lost(self, e, G, tpe=None):
+        self._write_binary(e, G, tpe, LOST, 'Lost')
+
+    def counted(self, tpe, delta):
+        self._append_count(tpe, delta)
+
+        if self.log_patterns:
+            self.log.info('Count %s %+d' % (tpe, delta))
+
+    def _write_binary(self, e, G, tpe, kind, verb):
+        e, code = self._prepare(e, G)
+        tpe = code if code is not None else tpe
+        self._append(tpe, kind, e)
+
+        if self.log_patterns:
+            self.log.info('%s %s: %s' % (verb, tpe, str(e)))
+
+    def _append(self, tpe, kind, e):
+        # the per-pattern path, hence the inlined _tag and _reserve fast paths
+        k = len(e)
+        tag = self.tags.get(tpe) or self._tag(tpe)
+        record = _ids_structs.get(k) or _ids_struct(k)
+        if self._pos + record.size > len(self._buffer):
+            self._flush()
+        record.pack_into(self._buffer, self._pos, tag, kind | k, *e)
+        self._pos += record.size
+
+    def _append_count(self, tpe, delta):
+        tag = self._tag(tpe)
+        self._reserve(_RECORD.size + _DELTA.size)
+        _RECORD.pack_into(self._buffer, self._pos, tag, COUNT)
+        _DELTA.pack_into(self._buffer, self._pos + _RECORD.size, delta)
+        self._pos += _RECORD.size + _DELTA.size
+
+    def _tag(self, tpe):
+        tag = self.tags.get(tpe)
+        if tag is None:
+            tag = self.tags[tpe] = len(self.tags) + 1
+            name = (tpe or '').encode()
+            self._reserve(_RECORD.size + len(name))
+            _RECORD.pack_into(self._buffer, self._pos, 0, len(name))
+            self._pos += _RECORD.size
+            self._buffer[self._pos:self._pos + len(name)] = name
+            self._pos += len(name)
+        return tag
+
+    def _reserve(self, size):
+        if self._pos + size > len(self._buffer):
+            self._flush()
+
+    def _flush(self):
+        if self._pos > 0:
+            self._check_writer()
+            self._full.put((self._buffer, self._pos))
+            self._buffer = self._free.get()  # blocks while the writer is behind
+            if self._buffer is None:
+                self._check_writer()
+            self._pos = 0
+
+    def _check_writer(self):
+        if self._error is not None:
+            raise self._error
+
+    def _write_buffers(self, file, compressor):
+        try:
+            with file:
+                file.write(PATTERNS_MAGIC)
+                file.write(_HEADER.pack(FLAG_ZLIB if compressor is not None else 0))
+                while True:
+                    item = self._full.get()
+                    if item is None:
+                        break
+                    buffer, size = item
+                    data = memoryview(buffer)[:size]
+                    file.write(compressor.compress(data) if compressor is not None else data)
+                    self._free.put(buffer)
+                if compressor is not None:
+                    file.write(compressor.flush())
+        except BaseException as error:
+            # raised by the next _flush or close; None wakes a _flush
+            # waiting for a free buffer
+            self._error = error
+            self._free.put(None)
+
+    def worker(self, i):
+        return BinaryPatternOutput('%s.part%d' % (self.path, i), self.canonicalize, self.sort,
+                                   log_patterns=self.log_patterns, codes=self.codes, compress=self.compress,
+                                   buffer_size=self.buffer_size, num_buffers=self.num_buffers)
+
+    def merge(self, other):
+        # tags are numbered per file, so the part's records are re-encoded
+        for tpe, e, value in read_patterns(other.path):
+            if e is None:
+                self._append_count(tpe, value)
+            else:
+                self._append(tpe, FOUND if value > 0 else LOST, e)
+        os.remove(other.path)
+
+    def close(self):
+        if self._writer is not None:
+            try:
+                self._flush()
+            finally:
+                self._full.put(None)
+                self._writer.join()
+                self._writer = None
+        self._check_writer()
+
+    def __getstate__(self):
+        # a closed worker output travels back to the parent by path
+        return {'path': self.path}
+
+
+def read_patterns(path, chunk_size=1 << 20):
+    # Yields (tpe, vertices, 1) for found patterns, (tpe, vertices, -1) for
+    # lost ones and (tpe, None, delta) for counted ones. Uncompressed files
+    # are memory-mapped and decoded in place.
+    with open(path, 'rb') as file:
+        if file.read(len(PATTERNS_MAGIC)) != PATTERNS_MAGIC:
+            raise ValueError('\'%s\' is not a binary pattern file' % path)
+        flags, = _HEADER.unpack(file.read(_HEADER.size))
+        if flags & FLAG_ZLIB:
+            yield from _records(_decompressed_chunks(file, chunk_size))
+            return
+        start = len(PATTERNS_MAGIC) + _HEADER.size
+        if os.fstat(file.fileno()).st_size == start:
+            return
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    yield from _records([memoryview(data)[start:]])
+
+
+def _decompressed_chunks(file, chunk_size):
+    decompressor = zlib.decompressobj()
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        yield decompressor.decompress(data)
+    yield decompressor.flush()
+
+
+def _records(chunks):
+    # a record can straddle two chunks: the incomplete tail is carried over
+    tags = [None]
+    pending = b''
+    for chunk in chunks:
+        data = pending + bytes(chunk) if pending else chunk
+        pos, end = 0, len(data)
+        while pos + _RECORD.size <= end:
+            tag, size = _RECORD.unpack_from(data, pos)
+            kind, k = size & KIND, size & ~KIND
+            if tag == 0:
+                length = _RECORD.size + size
+            elif kind == COUNT:
+                length = _RECORD.size + _DELTA.size
+            else:
+                length = _RECORD.size + 4 * k
+            if pos + length > end:
+                break
+            if tag == 0:
+                tags.append(bytes(data[pos + _RECORD.size:pos + length]).decode() or None)
+            elif kind == COUNT:
+                yield tags[tag], None, _DELTA.unpack_from(data, pos + _RECORD.size)[0]
+            else:
+                yield tags[tag], list(_ids_struct(k).unpack_from(data, pos)[2:]), -1 if kind == LOST else 1
+            pos += length
+        pending = bytes(data[pos:])
+    if pending:
+        raise ValueError('truncated binary pattern file')
@@ -0,0 +1,227 @@
+import logging
+from array import array
+from bisect import bisect_left
+
+from tesseract import canonical, mining
+from tesseract.embedding import Embedding
+
+
+LOG = logging.getLogger('LABL')
+
+# Optional vertex and edge labels. Label files have one 'vertex label' or
+# 'u v label' line per labeled vertex or edge, with the vertex ids of the
+# edge list; labels are any word, numbered in order of first appearance.
+# Vertices and edges without a label have label UNLABELED, whose name is
+# None: label names lists start as [None].
+
+UNLABELED = 0
+
+
+def _rank(G):
+    # input id -> vertex of G
+    if G.ids is None:
+        return None
+    return {u: v for v, u in enumerate(G.ids)}
+
+
+def read_vertex_labels(path, G, names):
+    # Returns the label of every vertex of G, adding new label names to names
+    rank = _rank(G)
+    ids = {name: i for i, name in enumerate(names)}
+    labels = array('I', bytes(4 * G.number_of_nodes()))
+    skipped = 0
+    with open(path, 'r') as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) != 2:
+                raise ValueError('invalid vertex label \'%s\'' % line.strip())
+            v = int(fields[0]) if rank is None else rank.get(int(fields[0]))
+            if v is None or not G.has_node(v):
+                skipped += 1
+                continue
+            labels[v] = ids.get(fields[1]) or _add_name(names, ids, fields[1])
+    if skipped:
+        LOG.warning('Skipped the labels of %d vertices not in the graph' % skipped)
+    return labels
+
+
+def read_edge_labels(path, G, names):
+    # Returns {(u, v): label} with u < v, adding new label names to names
+    rank = _rank(G)
+    ids = {name: i for i, name in enumerate(names)}
+    labels = {}
+    with open(path, 'r') as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) != 3:
+                raise ValueError('invalid edge label \'%s\'' % line.strip())
+            u, v = int(fields[0]), int(fields[1])
+            if rank is not None:
+                u, v = rank.get(u), rank.get(v)
+                if u is None or v is None:
+                    continue
+            labels[(u, v) if u < v else (v, u)] = ids.get(fields[2]) or _add_name(names, ids, fields[2])
+    return labels
+
+
+def _add_name(names, ids, name):
+    ids[name] = len(names)
+    names.append(name)
+    return ids[name]
+
+
+def load(G, vertex_path=None, edge_path=None):
+    names = [None]
+    if vertex_path is not None:
+        vertex_labels = read_vertex_labels(vertex_path, G, names)
+    else:
+        vertex_labels = array('I', bytes(4 * G.number_of_nodes()))
+    edge_labels = read_edge_labels(edge_path, G, names) if edge_path is not None else None
+    return LabelIndex(G, vertex_labels, names, edge_labels)
+
+
+class LabelIndex:
+    # Inverted index label -> vertices, and adjacency partitioned by label:
+    # the neighbors of v are kept sorted by (label, vertex), so those of one
+    # label are a slice found by binary search. Built from the graph as it
+    # is; vertices added later are unlabeled.
+
+    def __init__(self, G, labels, names, edge_labels=None):
+        self.labels = labels
+        self.names = names
+        self.edge_labels = edge_labels if edge_labels is not None else {}
+        self.members = [array('I') for _ in names]
+        for v in G.nodes:
+            self.members[labels[v]].append(v)
+        self.offsets = array('Q', [0])
+        self.keys = array('Q')
+        for v in G.nodes:
+            self.keys.extend(sorted(labels[u] << 32 | u for u in G.neighbors(v)))
+            self.offsets.append(len(self.keys))
+
+    def label_id(self, name):
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise ValueError('unknown label \'%s\'' % name)
+
+    def label(self, v):
+        return self.labels[v] if v < len(self.labels) else UNLABELED
+
+    def vertices(self, label):
+        return self.members[label]
+
+    def neighbors(self, v, label):
+        if v + 1 >= len(self.offsets):
+            return []
+        lo, hi = self.offsets[v], self.offsets[v + 1]
+        i = bisect_left(self.keys, label << 32, lo, hi)
+        j = bisect_left(self.keys, (label + 1) << 32, i, hi)
+        return [key & 0xffffffff for key in self.keys[i:j]]
+
+    def edge_label(self, u, v):
+        return self.edge_labels.get((u, v) if u < v else (v, u), UNLABELED)
+
+
+class LabelQuery:
+    # The labels the registered patterns can use: matches only have vertices
+    # with a label in allowed and edges with a label in allowed_edges (None:
+    # any), and contain at least one vertex labeled anchor (None: any).
+
+    def __init__(self, index, anchor=None, allowed=None, allowed_edges=None):
+        self.index = index
+        self.anchor = anchor
+        self.allowed = set(allowed) if allowed is not None else None
+        self.allowed_edges = set(allowed_edges) if allowed_edges is not None else None
+        if anchor is not None and self.allowed is not None:
+            self.allowed.add(anchor)
+
+    def allows(self, v):
+        return self.allowed is None or self.index.label(v) in self.allowed
+
+    def allows_edge(self, u, v):
+        return (self.allows(u) and self.allows(v)
+                and (self.allowed_edges is None or self.index.edge_label(u, v) in self.allowed_edges))
+
+    def anchored(self, e):
+        if self.anchor is None:
+            return True
+        label, anchor = self.index.label, self.anchor
+        for v in e:
+            if label(v) == anchor:
+                return True
+        return False
+
+    def roots(self, G):
+        # the vertices a static exploration has to start from
+        if self.anchor is None:
+            return G.nodes
+        return [v for v in self.index.vertices(self.anchor) if G.degree(v) > 0]
+
+
+def restrict(G, query, graph_class=None):
+    # The graph without the vertices and edges no match can use, with the
+    # same vertex ids, or G itself when the query allows everything.
+    if query.allowed is None and query.allowed_edges is None:
+        return G
+    index = query.index
+    offsets = array('Q', [0])
+    targets = array('I')
+    for v in G.nodes:
+        if query.allows(v):
+            if query.allowed is None:
+                neighbors = G.neighbors(v)
+            else:
+                neighbors = sorted(u for label in query.allowed for u in index.neighbors(v, label))
+            if query.allowed_edges is not None:
+                neighbors = [u for u in neighbors if index.edge_label(u, v) in query.allowed_edges]
+            targets.extend(neighbors)
+        offsets.append(len(targets))
+    H = (graph_class or type(G))(offsets, targets, ids=G.ids)
+    LOG.info('Restricted the graph to %d of %d edges' % (H.number_of_edges(), G.number_of_edges()))
+    return H
+
+
+def anchored_explore(G, alg, s, labels, anchor):
+    # forwards_explore with rule R1 relative to the anchors: the root is the
+    # smallest anchor of the embedding, so no smaller anchor may join it
+    if len(s) == alg.max:
+        return
+    c = s.vertices
+    root = c[0]
+    extend = len(s) + 1 < alg.max
+    candidates = s.extensions()
+    stats = alg.stats
+    if stats is not None:
+        depth = stats.reach(len(s) + 1)
+        stats.candidates[depth] += len(candidates)
+    for v in candidates:
+        if (v > root or labels[v] != anchor) and canonical.canonical_r2_embedding(s, v):
+            s.push(v, extend)
+            if alg.filter(c, G, v):
+                alg.process(c, G)
+                anchored_explore(G, alg, s, labels, anchor)
+            elif stats is not None:
+                stats.rejected_filter[depth] += 1
+            s.pop(extend)
+        elif stats is not None:
+            stats.reject(depth, v < root)
+
+
+def anchored_explore_all(G, alg, query, prune_graph=True):
+    # Same matches as mining.forwards_explore_all restricted to those with
+    # an anchor, seeded from the anchors only
+    if prune_graph:
+        G, _ = mining.prune(G, alg)
+    stats = alg.stats
+    for v in query.roots(G):
+        if stats is not None:
+            stats.begin(v)
+        anchored_explore(G, alg, Embedding(G, [v]), query.index.labels, query.anchor)
+        if stats is not None:
+            stats.end()
+    alg.finish()
@@ -1,108 +1,351 @@
 import logging
+from timeit import default_timer as timer
 
-from tesseract import canonical, graph
+from tesseract import algorithms, canonical, cliques, graph
+from tesseract.embedding import Embedding
 
 
 LOG = logging.getLogger('MINE')
 
 
-def forwards_explore(G, alg, c):
-    if len(c) == alg.max:
+def forwards_explore(G, alg, s):
+    if len(s) == alg.max:
         return
     else:
-        V = set(graph.neighborhood(c, G))
-        for v in V:
-            if v not in c:
-                if canonical.canonical(c, v, G):
-                    c.append(v)
-                    LOG.debug('%s %s' %(str(c), 'F'))
-                    if alg.filter(c, G, v):
-                        alg.process(c, G)
-                        forwards_explore(G, alg, c)
-                    c.pop()
-                else:
-                    LOG.debug('%s %s' %(str(c), 'R'))
-
-
-def forwards_explore_all(G, f):
-    for v in G.nodes:
-        forwards_explore(G, f, [v])
-
-
-def backwards_explore(G, alg, c, last_v=None):
-    if not canonical.canonical_r2_all(c, G):
-        LOG.debug('%s %s' %(str(c), 'R2'))
-        return
-    elif not canonical.canonical_r1_all(c):
-        LOG.debug('%s %s' %(str(c), 'R1'))
+        c = s.vertices
+        extend = len(s) + 1 < alg.max
+        candidates = s.extensions()
+        stats = alg.stats
+        if stats is not None:
+            depth = stats.reach(len(s) + 1)
+            stats.candidates[depth] += len(candidates)
+        for v in candidates:
+            if canonical.canonical_embedding(s, v):
+                s.push(v, extend)
+                if alg.filter(c, G, v):
+                    alg.process(c, G)
+                    forwards_explore(G, alg, s)
+                elif stats is not None:
+                    stats.rejected_filter[depth] += 1
+                s.pop(extend)
+            elif stats is not None:
+                stats.reject(depth, v < c[0])
+
+
+def uses_clique_engine(alg):
+    return isinstance(alg, algorithms.CliqueFinding) and alg.intersect
+
+
+def prune(G, alg):
+    # The subgraph the matches of alg can be in (see Algorithm.min_degree):
+    # every match is a connected embedding whose vertices all have at least
+    # min_degree neighbors in it, so it lies in the min_degree-core of G.
+    # Returns it and its vertices, the only roots worth exploring.
+    k = alg.min_degree()
+    H, vertices = graph.core_subgraph(G, k)
+    if H is not G:
+        LOG.info('Pruned %d of %d vertices below core %d' % (G.number_of_nodes() - len(vertices), G.number_of_nodes(), k))
+    return H, vertices
+
+
+def track_cores(G, alg):
+    # Keeps the core numbers needed by can_contribute up to date on a
+    # DynamicGraph. Below 2, every endpoint of an edge qualifies anyway, and
+    # the clique engine only looks at the common neighbors of an edge, which
+    # costs less than maintaining the cores.
+    k = alg.min_degree()
+    if k > 1 and not uses_clique_engine(alg) and (G.cores is None or G.core_cap < k):
+        G.track_cores(k)
+
+
+def can_contribute(G, alg, edge):
+    # False when an endpoint of the edge is below the core of the matches
+    # of alg, which can then not contain the edge
+    cores = getattr(G, 'cores', None)
+    if cores is None:
+        return True
+    k = min(alg.min_degree(), G.core_cap)
+    return cores[edge[0]] >= k and cores[edge[1]] >= k
+
+
+def forwards_explore_all(G, f, prune_graph=True):
+    G, roots = prune(G, f) if prune_graph else (G, G.nodes)
+    if uses_clique_engine(f):
+        cliques.clique_explore_all(G, f, roots=roots)
     else:
-        LOG.debug('%s %s' %(str(c), 'F'))
-        if alg.filter(c, G, last_v):
+        stats = f.stats
+        for v in roots:
+            if stats is not None:
+                stats.begin(v)
+            forwards_explore(G, f, Embedding(G, [v]))
+            if stats is not None:
+                stats.end()
+    f.finish()
+
+
+def backwards_explore(G, alg, s, extension, batch=None, position=0):
+    # Grows s, which holds the updated edge, by one vertex of extension at a
+    # time, each vertex leaving the extension of the next ones (ESU): the
+    # vertices a new member v adds to it are its exclusive neighbors, those
+    # not adjacent to s yet, read off the embedding's neighbor counts. Every
+    # connected set through the edge is reached by exactly one path, so no
+    # canonicality check is needed.
+    if len(s) == alg.max:
+        return
+    c = s.vertices
+    extend = len(s) + 1 < alg.max
+    stats = alg.stats
+    if stats is not None:
+        depth = stats.reach(len(s) + 1)
+        stats.candidates[depth] += len(extension)
+    extension = list(extension)
+    while extension:
+        v = extension.pop()
+        if batch is not None and batch.brings_earlier(s.members, v, position):
+            if stats is not None:
+                stats.rejected_batch[depth] += 1
+            continue
+        exclusive = [u for u in G.neighbors(v) if u not in s.count] if extend else None
+        s.push(v, extend)
+        if alg.filter(c, G, v):
             alg.process(c, G)
-        else:
-            return
+            if extend:
+                backwards_explore(G, alg, s, extension + exclusive, batch=batch, position=position)
+        elif stats is not None:
+            stats.rejected_filter[depth] += 1
+        s.pop(extend)
 
-    if len(c) > alg.max:
+
+def backwards_explore_edge(G, alg, edge, batch=None, position=0):
+    if not can_contribute(G, alg, edge):
         return
-    else:
-        V = set(filter(lambda v: last_v is None or True, graph.neighborhood(c, G)))
-        for v in V:
-            if v not in c:
-                for i in range(0, len(c) + 1):
-                    c.insert(i, v)
-                    if graph.is_connected(v, c, G):
-                        backwards_explore(G, alg, c, v)
-                    c.pop(i)
+    stats = alg.stats
+    if stats is not None:
+        stats.begin('%s%d-%d' % (REMOVE if alg.sign < 0 else ADD, edge[0], edge[1]))
+    s = Embedding(G, edge)
+    backwards_explore(G, alg, s, s.extensions(), batch=batch, position=position)
+    if stats is not None:
+        stats.end()
 
 
 def backwards_explore_update(G, alg, edge, add_to_graph=True):
-    if len(edge) != 2:
+    # Same matches as middleout_explore_update, from the other engine
+    if len(edge) != 2 or edge[0] == edge[1] or G.has_edge(edge[0], edge[1]):
         return
     G.add_edge(edge[0], edge[1])
-    backwards_explore(G, alg, edge)
-    backwards_explore(G, alg, [edge[1], edge[0]])
+    alg.begin_update([edge])
+    backwards_explore_edge(G, alg, edge)
+    alg.end_update()
     if not add_to_graph:
         G.remove_edge(edge[0], edge[1])
 
 
-def middleout_explore(G, alg, c, ignore=[]):
+def backwards_explore_batch(G, alg, edges, add_to_graph=True):
+    # Same matches as middleout_explore_batch
+    batch = apply_batch(G, edges)
+    alg.begin_update(batch.edges)
+    for i, edge in enumerate(batch.edges):
+        backwards_explore_edge(G, alg, edge, batch=batch, position=i)
+    alg.end_update()
+    if not add_to_graph:
+        for u, v in batch.edges:
+            G.remove_edge(u, v)
+    return batch
+
+
+class Batch:
+    # Edges applied to the graph together. An embedding containing several of
+    # them is only reported from the first one in batch order: exploring from
+    # edge i rejects every vertex that would bring in an edge j < i.
+
+    def __init__(self):
+        self.edges = []
+        self.index = {}  # vertex -> {neighbor: position of their batch edge}
+
+    def __len__(self):
+        return len(self.edges)
+
+    def append(self, u, v):
+        i = len(self.edges)
+        self.edges.append([u, v])
+        self.index.setdefault(u, {})[v] = i
+        self.index.setdefault(v, {})[u] = i
+
+    def brings_earlier(self, members, v, i):
+        for u, j in self.index.get(v, {}).items():
+            if j < i and u in members:
+                return True
+        return False
+
+
+def apply_batch(G, edges):
+    # Adds the edges to G and returns the batch of those that were new.
+    batch = Batch()
+    for edge in edges:
+        u, v = edge[0], edge[1]
+        if u != v and not G.has_edge(u, v):
+            G.add_edge(u, v)
+            batch.append(u, v)
+    return batch
+
+
+def removal_batch(G, edges):
+    # Returns the batch of the edges that are in G, without removing them.
+    batch = Batch()
+    for edge in edges:
+        u, v = edge[0], edge[1]
+        if G.has_edge(u, v) and v not in batch.index.get(u, ()):
+            batch.append(u, v)
+    return batch
+
 
-    # c: start as a single edge e.g. (0,1) and every recursion adds a 
+def middleout_explore(G, alg, s, ignore=[], batch=None, position=0):
+
+    # s: starts as a single edge e.g. (0,1) and every recursion adds a
     # neighbour to it
 
     # Reaches the base case when the maximum size clique is found
-    if len(c) == alg.max:
+    if len(s) == alg.max:
         return
     else:
+        c = s.vertices
+        extend = len(s) + 1 < alg.max
+
+        # The extension set (neighbours of the embedding that are not in it)
+        # is maintained incrementally by the embedding state
+        candidates = s.extensions()
+        stats = alg.stats
+        if stats is not None:
+            depth = stats.reach(len(s) + 1)
+            stats.candidates[depth] += len(candidates)
+        for v in candidates:
+            if canonical.canonical_r2_embedding(s, v, ignore=ignore):
 
-        # Get all the connected neighbour vertex of the edge
-        V = set(graph.neighborhood(c, G))
-        for v in V:
-            # If the edge c does not contain the vertex
-            if v not in c:
-                if canonical.canonical_r2(c, v, G, ignore=ignore):
-                    c.append(v)
-                    LOG.debug('%s %s' %(str(c), 'F'))
+                # Embeddings with an earlier edge of the batch belong to it
+                if batch is not None and batch.brings_earlier(s.members, v, position):
+                    if stats is not None:
+                        stats.rejected_batch[depth] += 1
+                    continue
 
-                    # Check if the neighor is connected to any sides of the edge
-                    if alg.filter(c, G, v):
+                s.push(v, extend)
 
-                        # For cliques, we find a n-d clique
-                        alg.process(c, G)
+                # Check if the neighor is connected to any sides of the edge
+                if alg.filter(c, G, v):
 
-                        # Keep going to find a larger clique
-                        middleout_explore(G, alg, c, ignore=ignore)
-                    c.pop()
-                else:
-                    LOG.debug('%s %s' %(str(c), 'R'))
+                    # For cliques, we find a n-d clique
+                    alg.process(c, G)
+
+                    # Keep going to find a larger clique
+                    middleout_explore(G, alg, s, ignore=ignore, batch=batch, position=position)
+                elif stats is not None:
+                    stats.rejected_filter[depth] += 1
+                s.pop(extend)
+            elif stats is not None:
+                stats.rejected_r2[depth] += 1
 
 
 def middleout_explore_update(G, alg, edge, add_to_graph=True):
-    if len(edge) != 2:
+    # Like apply_batch, self-loops and edges already in G add nothing
+    if len(edge) != 2 or edge[0] == edge[1] or G.has_edge(edge[0], edge[1]):
         return
     G.add_edge(edge[0], edge[1])
-
-    # I think the "ignore" here prevent redundant exploration
-    middleout_explore(G, alg, edge, ignore=[edge[1]])
+    alg.begin_update([edge])
+    _explore_edge(G, alg, edge, ADD)
+    alg.end_update()
     if not add_to_graph:
         G.remove_edge(edge[0], edge[1])
+
+
+def middleout_explore_remove(G, alg, edge, remove_from_graph=True):
+    # Walks the matches through the edge while it is still in the graph and
+    # reports them as lost, then removes it.
+    if len(edge) != 2 or not G.has_edge(edge[0], edge[1]):
+        return
+    alg.begin_update([edge], sign=-1)
+    _explore_edge(G, alg, edge, REMOVE)
+    alg.end_update()
+    if remove_from_graph:
+        G.remove_edge(edge[0], edge[1])
+
+
+def _explore_edge(G, alg, edge, op, batch=None, position=0):
+    if not can_contribute(G, alg, edge):
+        return
+    stats = alg.stats
+    if stats is not None:
+        stats.begin('%s%d-%d' % (op, edge[0], edge[1]))
+    if uses_clique_engine(alg):
+        cliques.clique_explore_update(G, alg, edge, batch=batch, position=position)
+    else:
+        # edge[1] is part of the starting edge rather than an extension, so
+        # rule R2 does not reject vertices on its account
+        middleout_explore(G, alg, Embedding(G, edge), ignore=[edge[1]], batch=batch, position=position)
+    if stats is not None:
+        stats.end()
+
+
+def middleout_explore_batch_edge(G, alg, batch, i):
+    _explore_edge(G, alg, batch.edges[i], REMOVE if alg.sign < 0 else ADD, batch=batch, position=i)
+
+
+def middleout_explore_batch(G, alg, edges, add_to_graph=True):
+    # Applies all edges first, then explores once per new edge; every new
+    # embedding is reported exactly once (see Batch).
+    start = timer()
+    batch = apply_batch(G, edges)
+    if alg.stats is not None:
+        alg.stats.add_time('apply', timer() - start)
+    alg.begin_update(batch.edges)
+    for i in range(len(batch)):
+        middleout_explore_batch_edge(G, alg, batch, i)
+    alg.end_update()
+    if not add_to_graph:
+        for u, v in batch.edges:
+            G.remove_edge(u, v)
+    return batch
+
+
+def middleout_explore_remove_batch(G, alg, edges, remove_from_graph=True):
+    # Mirror of middleout_explore_batch: every match that contains at least
+    # one of the edges is reported lost once, before any of them is removed.
+    batch = removal_batch(G, edges)
+    alg.begin_update(batch.edges, sign=-1)
+    for i in range(len(batch)):
+        middleout_explore_batch_edge(G, alg, batch, i)
+    alg.end_update()
+    if remove_from_graph:
+        for u, v in batch.edges:
+            G.remove_edge(u, v)
+    return batch
+
+
+ADD = '+'
+REMOVE = '-'
+
+
+def update_op(update):
+    # an update is [u, v] or [u, v, op] with op ADD or REMOVE
+    return update[2] if len(update) > 2 else ADD
+
+
+def middleout_explore_updates(G, alg, updates, batch_size=1):
+    # Applies a mixed stream of additions and removals in order, grouping
+    # consecutive updates of the same kind into batches of up to batch_size.
+    run, op = [], ADD
+    for update in updates:
+        if run and (update_op(update) != op or len(run) == batch_size):
+            _explore_run(G, alg, run, op)
+            run = []
+        op = update_op(update)
+        run.append(update)
+    if run:
+        _explore_run(G, alg, run, op)
+
+
+def _explore_run(G, alg, run, op):
+    if op == REMOVE:
+        middleout_explore_remove_batch(G, alg, run)
+    elif len(run) == 1:
+        middleout_explore_update(G, alg, run[0][:2])
+    else:
+        middleout_explore_batch(G, alg, run)
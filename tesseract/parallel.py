@@ -0,0 +1,258 @@
+import functools
+import logging
+import multiprocessing
+import os
+import queue
+import traceback
+from collections import namedtuple
+
+from tesseract import canonical, cliques, mining
+from tesseract.embedding import Embedding
+
+
+LOG = logging.getLogger('PARA')
+
+# Workers are forked, so they share the parent's graph arrays (and the page
+# cache of a memory-mapped snapshot) instead of receiving a pickled copy.
+_CONTEXT = multiprocessing.get_context('fork')
+
+
+def _root_cost(G, v):
+    d = G.degree(v)
+    return d * d
+
+
+def _edge_cost(G, edge):
+    d = G.degree(edge[0]) + G.degree(edge[1])
+    return d * d
+
+
+def _chunks(costs, workers, chunks_per_worker=16):
+    # Items ordered by decreasing estimated cost, grouped so every chunk has
+    # roughly the same cost: hubs end up alone in the first chunks.
+    costs = sorted(costs, reverse=True)
+    target = max(1, sum(cost for cost, _ in costs) // (workers * chunks_per_worker))
+    chunk, chunk_cost = [], 0
+    for cost, item in costs:
+        chunk.append(item)
+        chunk_cost += cost
+        if chunk_cost >= target:
+            yield chunk
+            chunk, chunk_cost = [], 0
+    if chunk:
+        yield chunk
+
+
+class _Scheduler:
+    def __init__(self, workers, steal_depth):
+        self.tasks = _CONTEXT.Queue()
+        self.results = _CONTEXT.Queue()
+        self.pending = _CONTEXT.Value('q', 0)
+        self.idle = _CONTEXT.RawValue('i', 0)  # read without the lock, see split
+        self.idle_lock = _CONTEXT.Lock()
+        self.workers = workers
+        self.steal_depth = steal_depth
+
+    def put(self, task):
+        with self.pending.get_lock():
+            self.pending.value += 1
+        self.tasks.put(task)
+
+    def done(self):
+        with self.pending.get_lock():
+            self.pending.value -= 1
+
+    def finished(self):
+        with self.pending.get_lock():
+            return self.pending.value == 0
+
+    def set_idle(self, delta):
+        with self.idle_lock:
+            self.idle.value += delta
+
+    def split(self, alg, prefix, candidates, i, end):
+        # Hands half of candidates[i:end] to an idle worker, with what alg
+        # remembers about prefix, and returns the new end of the caller's
+        # share. The read of idle is racy on purpose: a stale value only
+        # delays or wastes a split.
+        if self.idle.value > 0 and end - i > 1:
+            half = (i + end) // 2
+            self.put((list(prefix), candidates[half:end], alg.prefix_state(prefix)))
+            return half
+        return end
+
+
+def _explore(G, alg, sched, s, candidates):
+    # forwards_explore over an explicit candidate list, giving away part of
+    # the list whenever a worker is idle. Below steal_depth it falls back to
+    # the sequential explorer.
+    if len(s) >= alg.max:
+        return
+    c = s.vertices
+    extend = len(s) + 1 < alg.max
+    stats = alg.stats
+    if stats is not None:
+        depth = stats.reach(len(s) + 1)
+    i, end = 0, len(candidates)
+    while i < end:
+        if extend:
+            end = sched.split(alg, c, candidates, i, end)
+        v = candidates[i]
+        i += 1
+        if stats is not None:
+            stats.candidates[depth] += 1  # counted one by one: the list can be split
+        if canonical.canonical_embedding(s, v):
+            s.push(v, extend)
+            if alg.filter(c, G, v):
+                alg.process(c, G)
+                if len(s) <= sched.steal_depth:
+                    _explore(G, alg, sched, s, s.extensions())
+                else:
+                    mining.forwards_explore(G, alg, s)
+            elif stats is not None:
+                stats.rejected_filter[depth] += 1
+            s.pop(extend)
+        elif stats is not None:
+            stats.reject(depth, v < c[0])
+
+
+def _run_forwards(G, alg, sched, task):
+    prefix, candidates, state = task
+    if len(prefix) == 0:
+        # a chunk of roots, which can be split like any other candidate list
+        i, end = 0, len(candidates)
+        while i < end:
+            end = sched.split(alg, prefix, candidates, i, end)
+            s = Embedding(G, [candidates[i]])
+            i += 1
+            if alg.stats is not None:
+                alg.stats.begin(s.vertices[0])
+            _explore(G, alg, sched, s, s.extensions())
+            if alg.stats is not None:
+                alg.stats.end()
+    else:
+        alg.resume(prefix, state)
+        _explore(G, alg, sched, Embedding(G, prefix), candidates)
+
+
+def _run_cliques(index, G, alg, sched, task):
+    _, roots = task
+    for v in roots:
+        if alg.stats is not None:
+            alg.stats.begin(v)
+        cliques.clique_explore_root(G, alg, index, v)
+        if alg.stats is not None:
+            alg.stats.end()
+
+
+def _run_batch(batch, G, alg, sched, task):
+    _, positions = task
+    for i in positions:
+        mining.middleout_explore_batch_edge(G, alg, batch, i)
+
+
+# what a worker sends instead of its result when it raises
+_Failure = namedtuple('_Failure', ['worker', 'traceback'])
+
+
+def report(results, i, work, *args):
+    # Body of worker i: puts work(*args) on results, or the traceback of the
+    # exception it raised, so the parent never waits for a missing result.
+    try:
+        result = work(*args)
+    except Exception:
+        results.put(_Failure(i, traceback.format_exc()))
+    else:
+        results.put(result)
+
+
+def gather(processes, results, poll=0.1):
+    # One result per process, in any order. When a worker fails, or dies
+    # without reporting (killed, out of memory), the others are terminated
+    # and a RuntimeError is raised.
+    gathered = []
+    try:
+        while len(gathered) < len(processes):
+            try:
+                result = results.get(timeout=poll)
+            except queue.Empty:
+                for p in processes:
+                    if p.exitcode not in (None, 0):
+                        raise RuntimeError('worker process %d exited with code %d' % (p.pid, p.exitcode))
+                continue
+            if isinstance(result, _Failure):
+                raise RuntimeError('worker %d failed:\n%s' % (result.worker, result.traceback))
+            gathered.append(result)
+    except BaseException:
+        for p in processes:
+            p.terminate()
+        raise
+    finally:
+        for p in processes:
+            p.join()
+    return gathered
+
+
+def _worker(G, alg, sched, i, run):
+    alg.out = alg.out.worker(i)
+    alg.reset_stats()
+    while True:
+        sched.set_idle(1)
+        try:
+            task = sched.tasks.get(timeout=0.01)
+        except queue.Empty:
+            if sched.finished():
+                break
+            continue
+        finally:
+            sched.set_idle(-1)
+        run(G, alg, sched, task)
+        sched.done()
+    alg.out.close()
+    return alg
+
+
+def _run_pool(G, alg, sched, run):
+    # Each worker has its own copy of alg and its own output, merged into alg
+    # and alg.out once the task queue is drained.
+    processes = [_CONTEXT.Process(target=report, args=(sched.results, i, _worker, G, alg, sched, i, run))
+                 for i in range(sched.workers)]
+    for p in processes:
+        p.start()
+    for result in gather(processes, sched.results):
+        alg.merge(result)
+        alg.out.merge(result.out)
+    LOG.debug('Merged results of %d workers' % sched.workers)
+
+
+def forwards_explore_all_parallel(G, alg, workers=None, steal_depth=2, prune_graph=True):
+    # Same matches as mining.forwards_explore_all: canonicality rule R1 makes
+    # every root's subtree independent.
+    G, roots = mining.prune(G, alg) if prune_graph else (G, G.nodes)
+    sched = _Scheduler(workers or os.cpu_count(), steal_depth)
+    if mining.uses_clique_engine(alg):
+        index = cliques.CliqueIndex(G)
+        for chunk in _chunks(((index.root_cost(v), v) for v in roots), sched.workers):
+            sched.put(([], chunk))
+        _run_pool(G, alg, sched, functools.partial(_run_cliques, index))
+    else:
+        for chunk in _chunks(((_root_cost(G, v), v) for v in roots), sched.workers):
+            sched.put(([], chunk, None))
+        _run_pool(G, alg, sched, _run_forwards)
+    alg.finish()
+
+
+def middleout_explore_batch_parallel(G, alg, edges, workers=None, add_to_graph=True):
+    # Same matches as mining.middleout_explore_batch: once the whole batch is
+    # applied, the exploration from each of its edges is independent.
+    batch = mining.apply_batch(G, edges)
+    sched = _Scheduler(workers or os.cpu_count(), 0)
+    for chunk in _chunks(((_edge_cost(G, edge), i) for i, edge in enumerate(batch.edges)), sched.workers):
+        sched.put(([], chunk))
+    alg.begin_update(batch.edges)
+    _run_pool(G, alg, sched, functools.partial(_run_batch, batch))
+    alg.end_update()
+    if not add_to_graph:
+        for u, v in batch.edges:
+            G.remove_edge(u, v)
+    return batch
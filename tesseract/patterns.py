@@ -0,0 +1,185 @@
+# Small-pattern helpers working on the induced adjacency of an embedding,
+# stored as one bitmask per position: bit j of masks[i] is set when e[i] and
+# e[j] are adjacent. Embeddings are small, so everything here is cheap once
+# the masks are built, and results can be cached by the masks themselves.
+
+MAX_DP_SIZE = 12
+MAX_CACHE_SIZE = 1 << 20
+
+_hamiltonian_cache = {}
+_code_cache = {}
+_order_cache = {}
+
+
+def _cache_put(cache, key, value):
+    if len(cache) >= MAX_CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+
+
+def adjacency_masks(e, G):
+    k = len(e)
+    masks = [0] * k
+    for i in range(k):
+        u = e[i]
+        for j in range(i + 1, k):
+            if G.has_edge(u, e[j]):
+                masks[i] |= 1 << j
+                masks[j] |= 1 << i
+    return tuple(masks)
+
+
+def is_connected(masks):
+    reached = frontier = 1
+    while frontier:
+        new = 0
+        for v in _bits(frontier):
+            new |= masks[v]
+        frontier = new & ~reached
+        reached |= frontier
+    return reached == (1 << len(masks)) - 1
+
+
+def _bits(x):
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def _hamiltonian_dp(masks):
+    # dp[S] is the set of vertices a path from vertex 0 through exactly the
+    # vertices of S can end at (only subsets containing vertex 0 are used)
+    k = len(masks)
+    full = (1 << k) - 1
+    dp = [0] * (full + 1)
+    dp[1] = 1
+    for S in range(1, full + 1, 2):
+        ends = dp[S]
+        if ends:
+            for v in _bits(ends):
+                for u in _bits(masks[v] & ~S):
+                    dp[S | 1 << u] |= 1 << u
+    return dp[full] & masks[0] != 0
+
+
+def _hamiltonian_search(masks):
+    k = len(masks)
+    full = (1 << k) - 1
+
+    def extend(v, S):
+        if S == full:
+            return masks[v] & 1 != 0
+        return any(extend(u, S | 1 << u) for u in _bits(masks[v] & ~S))
+
+    return extend(0, 1)
+
+
+def is_hamiltonian(masks):
+    # True when the induced subgraph has a cycle through all its vertices
+    k = len(masks)
+    if k < 3:
+        return False
+    degrees = [bin(m).count('1') for m in masks]
+    if min(degrees) < 2:
+        return False
+    if max(degrees) == 2:
+        return True  # embeddings are connected, and a connected 2-regular graph is a cycle
+    result = _hamiltonian_cache.get(masks)
+    if result is None:
+        result = _hamiltonian_dp(masks) if k <= MAX_DP_SIZE else _hamiltonian_search(masks)
+        _cache_put(_hamiltonian_cache, masks, result)
+    return result
+
+
+def _code(masks, perm):
+    # upper triangle of the adjacency matrix with rows/columns in perm order
+    code = 0
+    for i, u in enumerate(perm):
+        row = masks[u]
+        for v in perm[i + 1:]:
+            code = code << 1 | (row >> v & 1)
+    return code
+
+
+def _refine(masks, cells):
+    # Splits cells by the number of neighbors each vertex has in every cell
+    # until the ordered partition is stable (colour refinement).
+    while True:
+        cell_masks = [sum(1 << v for v in cell) for cell in cells]
+        refined = []
+        for cell in cells:
+            if len(cell) == 1:
+                refined.append(cell)
+                continue
+            groups = {}
+            for v in cell:
+                signature = tuple(bin(masks[v] & m).count('1') for m in cell_masks)
+                groups.setdefault(signature, []).append(v)
+            refined.extend(groups[signature] for signature in sorted(groups))
+        if len(refined) == len(cells):
+            return cells
+        cells = refined
+
+
+def _twins(masks, u, v):
+    both = 1 << u | 1 << v
+    return masks[u] & ~both == masks[v] & ~both
+
+
+def _search(masks, cells, best):
+    # Individualisation-refinement: the canonical form is the permutation
+    # with the largest code among the leaves of the search. Swapping twins is
+    # an automorphism, so only one vertex per class of twins is individualised.
+    cells = _refine(masks, cells)
+    for i, cell in enumerate(cells):
+        if len(cell) > 1:
+            tried = []
+            for v in cell:
+                if any(_twins(masks, u, v) for u in tried):
+                    continue
+                tried.append(v)
+                rest = [u for u in cell if u != v]
+                best = _search(masks, cells[:i] + [[v], rest] + cells[i + 1:], best)
+            return best
+    perm = [cell[0] for cell in cells]
+    code = _code(masks, perm)
+    return (code, perm) if best is None or code > best[0] else best
+
+
+def canonical_form(masks):
+    # (code, perm): the embedding's positions listed in perm order give an
+    # adjacency matrix that is the same for every isomorphic embedding.
+    form = _code_cache.get(masks)
+    if form is None:
+        form = _search(masks, [list(range(len(masks)))], None)
+        _cache_put(_code_cache, masks, form)
+    return form
+
+
+def canonical_code(masks):
+    # isomorphism class of the embedding: equal iff the patterns are isomorphic
+    return len(masks), canonical_form(masks)[0]
+
+
+def code_name(code):
+    k, bits = code
+    return '%d:%x' % (k, bits)
+
+
+def canonical_order(masks):
+    # Arabesque order of an embedding sorted by vertex id: start from the
+    # smallest vertex, then repeatedly take the smallest one adjacent to those
+    # already taken.
+    order = _order_cache.get(masks)
+    if order is None:
+        order, reached = [0], masks[0]
+        rest = (1 << len(masks)) - 2
+        while rest:
+            candidates = reached & rest or rest
+            i = (candidates & -candidates).bit_length() - 1
+            order.append(i)
+            rest &= ~(1 << i)
+            reached |= masks[i]
+        _cache_put(_order_cache, masks, order)
+    return order
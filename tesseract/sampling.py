@@ -0,0 +1,182 @@
+import logging
+import math
+import multiprocessing
+import random
+import statistics
+from timeit import default_timer as timer
+
+from tesseract import algorithms, canonical, cliques, io, mining, parallel, patterns
+from tesseract.embedding import Embedding
+
+
+LOG = logging.getLogger('SMPL')
+
+# Approximate counting with the exact explorers' building blocks. Every
+# sample is an unbiased estimate of the number of matches of each type:
+#  - 'roots': all the matches rooted at a uniformly sampled root (the
+#    exploration of forwards_explore_all is partitioned by root), times
+#    the number of roots
+#  - 'walks': one random descent of the exploration tree from a uniformly
+#    sampled root (Knuth's estimator), each match on the way weighted by
+#    the number of roots times the branching factors above it
+# Walks are much cheaper per sample, roots have a lower variance. Sample j
+# is drawn with its own generator seeded from (seed, j), and samples are
+# summed as integers, so a sample budget gives the same estimate whatever
+# the number of workers.
+
+METHODS = ('roots', 'walks')
+TOTAL = 'all'
+
+_CONTEXT = multiprocessing.get_context('fork')  # see parallel.py
+
+
+class _Tally(io.Output):
+    # types of the matches reported since the last clear
+    def __init__(self):
+        self.counts = {}
+
+    def found(self, e, G, tpe=None):
+        tpe = tpe if tpe is not None else 'match'
+        self.counts[tpe] = self.counts.get(tpe, 0) + 1
+
+    def clear(self):
+        counts, self.counts = self.counts, {}
+        return counts
+
+
+def _take_counts(alg):
+    # matches per type since the last call, which resets them
+    if isinstance(alg, algorithms.Composite):
+        counts = {}
+        for member in alg.algorithms.values():
+            for tpe, count in _take_counts(member).items():
+                counts[tpe] = counts.get(tpe, 0) + count
+    elif isinstance(alg, algorithms.MotifCounting):
+        counts = {patterns.code_name(code): count for code, count in alg.counts.items() if count}
+        alg.counts = {}
+    else:
+        counts = alg.out.clear()
+    alg.num_found = 0
+    return counts
+
+
+def root_sample(G, roots, alg, rng, index=None):
+    v = roots[rng.randrange(len(roots))]
+    if index is not None:
+        cliques.clique_explore_root(G, alg, index, v)
+    else:
+        mining.forwards_explore(G, alg, Embedding(G, [v]))
+    return {tpe: len(roots) * count for tpe, count in _take_counts(alg).items()}
+
+
+def walk_sample(G, roots, alg, rng, index=None):
+    s = Embedding(G, [roots[rng.randrange(len(roots))]])
+    c = s.vertices
+    weight = len(roots)
+    values = {}
+    while len(s) < alg.max:
+        children = []
+        for v in s.extensions():
+            if canonical.canonical_embedding(s, v):
+                s.push(v, False)
+                if alg.filter(c, G, v):
+                    children.append(v)
+                s.pop(False)
+        if not children:
+            break
+        weight *= len(children)
+        v = children[rng.randrange(len(children))]
+        s.push(v)
+        alg.filter(c, G, v)  # again, for filters that remember the last embedding (Composite)
+        alg.process(c, G)
+        for tpe, count in _take_counts(alg).items():
+            values[tpe] = values.get(tpe, 0) + weight * count
+    return values
+
+
+class Estimate:
+    # Sums of the samples and of their squares, per match type
+    def __init__(self):
+        self.samples = 0
+        self.sums = {}
+        self.squares = {}
+
+    def add(self, values):
+        self.samples += 1
+        values = dict(values)
+        values[TOTAL] = sum(values.values())
+        for tpe, x in values.items():
+            self.sums[tpe] = self.sums.get(tpe, 0) + x
+            self.squares[tpe] = self.squares.get(tpe, 0) + x * x
+
+    def merge(self, other):
+        self.samples += other.samples
+        for tpe, x in other.sums.items():
+            self.sums[tpe] = self.sums.get(tpe, 0) + x
+            self.squares[tpe] = self.squares.get(tpe, 0) + other.squares[tpe]
+
+    def interval(self, tpe, confidence=0.95):
+        # (estimate, low, high): normal approximation of the mean of samples
+        k = self.samples
+        if k == 0:
+            return 0.0, 0.0, 0.0
+        total = self.sums.get(tpe, 0)
+        mean = total / k
+        # exact integer sums until the division, whatever their magnitude
+        variance = (k * self.squares.get(tpe, 0) - total * total) / (k * (k - 1)) if k > 1 else math.inf
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        half = z * math.sqrt(max(variance, 0.0) / k)
+        return mean, max(0.0, mean - half), mean + half
+
+    def to_dict(self, confidence=0.95):
+        types = {}
+        for tpe in sorted(self.sums, key=str):
+            mean, low, high = self.interval(tpe, confidence)
+            types[tpe] = {'estimate': mean, 'low': low, 'high': high}
+        return {'samples': self.samples, 'confidence': confidence, 'types': types}
+
+
+def _run(G, roots, alg, method, seed, first, step, samples, end, index):
+    sample = root_sample if method == 'roots' else walk_sample
+    estimate = Estimate()
+    j = first
+    while (samples is None or j < samples) and (end is None or timer() < end):
+        estimate.add(sample(G, roots, alg, random.Random('%d-%d' % (seed, j)), index))
+        j += step
+    return estimate
+
+
+def approximate_count(G, alg, method='walks', samples=None, seconds=None, workers=1, seed=0):
+    # Draws samples until there are samples of them or seconds have passed
+    # (1000 samples when neither is set) and returns their Estimate.
+    if method not in METHODS:
+        raise ValueError('unknown sampling method \'%s\'' % method)
+    if samples is None and seconds is None:
+        samples = 1000
+    G, roots = mining.prune(G, alg)
+    estimate = Estimate()
+    if len(roots) == 0:
+        return estimate
+    index = cliques.CliqueIndex(G) if method == 'roots' and mining.uses_clique_engine(alg) else None
+    LOG.info('Sampling %s from %d roots with %d workers' % (method, len(roots), workers))
+    end = timer() + seconds if seconds is not None else None
+
+    out = alg.out
+    alg.out = _Tally()
+    alg.reset_stats()
+    try:
+        if workers <= 1:
+            return _run(G, roots, alg, method, seed, 0, 1, samples, end, index)
+        # forked like parallel.py, worker i drawing samples i, i + workers, ...
+        results = _CONTEXT.Queue()
+        processes = [_CONTEXT.Process(target=parallel.report,
+                                      args=(results, i, _run, G, roots, alg, method, seed, i, workers, samples, end, index))
+                     for i in range(workers)]
+        for p in processes:
+            p.start()
+        for result in parallel.gather(processes, results):
+            estimate.merge(result)
+        return estimate
+    finally:
+        alg.out = out
+        alg.reset_stats()
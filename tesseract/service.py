@@ -0,0 +1,342 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from tesseract import io, mining, stream
+
+
+LOG = logging.getLogger('SERV')
+
+
+# Long-lived mining service speaking JSON lines over a unix or TCP socket.
+# One writer task takes update batches off a bounded queue (producers wait
+# when it is full) and mines them in a single worker thread; the matches
+# found are then applied to the match index on the event loop in one step,
+# so queries always see the state after a whole batch and never wait for
+# the mining. Vertex ids in requests and events are those of the input
+# file (see CSRGraph.original_ids); unseen ones add vertices, up to
+# max_vertices. Requests, one JSON object per line:
+#   {"op": "update", "updates": [[u, v], [u, v, "-"], ...], "wait": false}
+#   {"op": "subscribe"}  then receive {"event": "match", ...} lines
+#   {"op": "count"}  matches per algorithm and pattern type
+#   {"op": "touching", "vertex": x}  current matches containing x
+#   {"op": "status"}
+
+
+class _Recorder(io.Output):
+    # what one algorithm reported while mining a batch
+
+    def __init__(self):
+        self.matches = []
+        self.counted_deltas = []
+
+    def found(self, e, G, tpe=None):
+        self.matches.append((tpe, tuple(sorted(G.original_ids(e))), 1))
+
+    def lost(self, e, G, tpe=None):
+        self.matches.append((tpe, tuple(sorted(G.original_ids(e))), -1))
+
+    def counted(self, tpe, delta):
+        self.counted_deltas.append((tpe, delta))
+
+    def take(self):
+        matches, counted = self.matches, self.counted_deltas
+        self.matches, self.counted_deltas = [], []
+        return matches, counted
+
+
+def _check_update(update):
+    # [u, v] or [u, v, op] with integer vertices, see mining.update_op
+    if (not isinstance(update, (list, tuple)) or len(update) not in (2, 3)
+            or any(type(u) is not int or u < 0 for u in update[:2])
+            or len(update) == 3 and update[2] not in (mining.ADD, mining.REMOVE)):
+        raise ValueError('invalid update %r: expected [u, v] or [u, v, \'-\'] with vertex ids >= 0' % (update,))
+    return list(update)
+
+
+def _fail(waiters, error):
+    for waiter in waiters:
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(error)
+
+
+class _Subscriber:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.task = asyncio.ensure_future(self._send())
+
+    async def _send(self):
+        while True:
+            event = await self.queue.get()
+            self.writer.write(json.dumps(event).encode() + b'\n')
+            await self.writer.drain()
+
+
+class MiningService:
+    def __init__(self, G, algorithms, queue_size=64, max_batch=1024, subscriber_queue_size=4096,
+                 index_matches=True, max_vertices=1 << 24):
+        # algorithms: name -> Algorithm, all mined on every update of G
+        self.G = G
+        self.max_vertices = max_vertices
+        self._vertex = stream.vertex_mapper(G, max_vertices)
+        self.algorithms = algorithms
+        self.max_batch = max_batch
+        self.subscriber_queue_size = subscriber_queue_size
+        self.index_matches = index_matches
+        for alg in algorithms.values():
+            alg.out = _Recorder()
+            mining.track_cores(G, alg)
+
+        self.version = 0  # number of batches applied
+        self.num_updates = 0
+        self.num_edges = G.number_of_edges()
+        self.counts = {name: {} for name in algorithms}
+        self.matches = {}  # vertex -> {(algorithm, type, vertices)}
+        self.subscribers = set()
+
+        self.updates = None
+        self.stopped = False
+        self._stopping = None  # future set by stop, for submitters waiting for room
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._queue_size = queue_size
+        self._writer_task = None
+
+    async def start(self, initialize=False):
+        # initialize: first mine the matches already in G
+        self.updates = asyncio.Queue(self._queue_size)
+        self._stopping = asyncio.get_running_loop().create_future()
+        if initialize:
+            self._apply(await asyncio.get_running_loop().run_in_executor(self.executor, self._mine_static))
+        self._writer_task = asyncio.ensure_future(self._write_loop())
+
+    async def stop(self):
+        # updates still queued are dropped: whoever waits for them gets an error
+        self.stopped = True
+        if self._stopping is not None and not self._stopping.done():
+            self._stopping.set_result(None)
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        while self.updates is not None and not self.updates.empty():
+            _fail(self.updates.get_nowait()[1:], RuntimeError('the service stopped'))
+        for subscriber in list(self.subscribers):
+            subscriber.task.cancel()
+        self.executor.shutdown()
+
+    # mining, in the executor thread
+
+    def _mine_static(self):
+        for alg in self.algorithms.values():
+            mining.forwards_explore_all(self.G, alg)  # motif counts come with finish
+        return self._take()
+
+    def _mine_updates(self, updates):
+        # same grouping as mining.middleout_explore_updates, every algorithm
+        # exploring each group
+        run, op = [], mining.ADD
+        for update in updates:
+            if run and mining.update_op(update) != op:
+                self._mine_run(run, op)
+                run = []
+            op = mining.update_op(update)
+            run.append(update)
+        if run:
+            self._mine_run(run, op)
+        return self._take()
+
+    def _mine_run(self, run, op):
+        if op == mining.REMOVE:
+            batch = mining.removal_batch(self.G, run)
+        else:
+            batch = mining.apply_batch(self.G, run)
+        for alg in self.algorithms.values():
+            alg.begin_update(batch.edges, sign=-1 if op == mining.REMOVE else 1)
+            for i in range(len(batch)):
+                mining.middleout_explore_batch_edge(self.G, alg, batch, i)
+            alg.end_update()
+        if op == mining.REMOVE:
+            for u, v in batch.edges:
+                self.G.remove_edge(u, v)
+
+    def _take(self):
+        return {name: alg.out.take() for name, alg in self.algorithms.items()}, self.G.number_of_edges()
+
+    # index, on the event loop
+
+    def _apply(self, result):
+        # no await in here: queries see all of a batch or none of it
+        results, num_edges = result
+        events = []
+        for name, (matches, counted) in results.items():
+            counts = self.counts[name]
+            for tpe, vertices, sign in matches:
+                counts[tpe] = counts.get(tpe, 0) + sign
+                if self.index_matches:
+                    key = (name, tpe, vertices)
+                    for v in vertices:
+                        if sign > 0:
+                            self.matches.setdefault(v, set()).add(key)
+                        else:
+                            entries = self.matches.get(v)
+                            if entries is not None:
+                                entries.discard(key)
+                                if not entries:
+                                    del self.matches[v]
+                events.append({'event': 'match', 'algorithm': name, 'type': tpe, 'vertices': list(vertices), 'sign': sign})
+            for tpe, delta in counted:
+                counts[tpe] = counts.get(tpe, 0) + delta
+                events.append({'event': 'count', 'algorithm': name, 'type': tpe, 'delta': delta})
+        self.num_edges = num_edges
+        self.version += 1
+        self._publish(events)
+
+    def _publish(self, events):
+        for subscriber in list(self.subscribers):
+            try:
+                for event in events:
+                    subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # a subscriber that cannot keep up is dropped rather than
+                # buffering without bound or holding back the mining
+                LOG.warning('Dropping a subscriber that fell behind')
+                self.subscribers.discard(subscriber)
+                subscriber.task.cancel()
+                subscriber.writer.close()
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            updates, waiters = [], []
+            item = await self.updates.get()
+            while True:
+                updates.extend(item[0])
+                if item[1] is not None:
+                    waiters.append(item[1])
+                if len(updates) >= self.max_batch or self.updates.empty():
+                    break
+                item = self.updates.get_nowait()
+            try:
+                result = await loop.run_in_executor(self.executor, self._mine_updates, updates)
+            except asyncio.CancelledError:
+                _fail(waiters, RuntimeError('the service stopped'))
+                raise
+            except Exception as error:
+                LOG.exception('Mining a batch of %d updates failed' % len(updates))
+                _fail(waiters, error)
+                continue
+            self._apply(result)
+            self.num_updates += len(updates)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(self.version)
+
+    # requests
+
+    async def submit(self, updates, wait=False):
+        # waits while the queue is full; with wait, also until the updates
+        # are applied, and returns the version that has them
+        updates = [_check_update(update) for update in updates]
+        updates = [self._vertices(update) for update in updates]
+        waiter = asyncio.get_running_loop().create_future() if wait else None
+        if self.stopped:
+            pass
+        elif self.updates.full():
+            # nobody makes room once the service stops
+            put = asyncio.ensure_future(self.updates.put((updates, waiter)))
+            await asyncio.wait([put, self._stopping], return_when=asyncio.FIRST_COMPLETED)
+            put.cancel()
+        else:
+            self.updates.put_nowait((updates, waiter))
+        if self.stopped:
+            raise RuntimeError('the service stopped')
+        return await waiter if wait else None
+
+    def _vertices(self, update):
+        # the update on G's vertices
+        u, v = update[:2]
+        try:
+            if self._vertex is not None:
+                return [self._vertex(u), self._vertex(v)] + update[2:]
+            if max(u, v) >= self.max_vertices:
+                raise ValueError('vertex ids must be below %d' % self.max_vertices)
+        except ValueError as error:
+            raise ValueError('invalid update %r: %s' % (update, error))
+        return update
+
+    def count(self):
+        return {'version': self.version, 'counts': {name: dict(counts) for name, counts in self.counts.items()}}
+
+    def touching(self, v, algorithm=None):
+        return {'version': self.version,
+                'matches': [{'algorithm': name, 'type': tpe, 'vertices': list(vertices)}
+                            for name, tpe, vertices in sorted(self.matches.get(v, ()), key=str)
+                            if algorithm is None or name == algorithm]}
+
+    def status(self):
+        return {'version': self.version, 'updates': self.num_updates, 'queued': self.updates.qsize(),
+                'vertices': self.G.number_of_nodes(), 'edges': self.num_edges,
+                'subscribers': len(self.subscribers)}
+
+    async def handle(self, request, writer):
+        op = request.get('op')
+        if op == 'update':
+            version = await self.submit(request['updates'], request.get('wait', False))
+            return {'queued': len(request['updates']), 'version': version}
+        elif op == 'subscribe':
+            self.subscribers.add(_Subscriber(writer, self.subscriber_queue_size))
+            return {'subscribed': True, 'version': self.version}
+        elif op == 'count':
+            return self.count()
+        elif op == 'touching':
+            return self.touching(request['vertex'], request.get('algorithm'))
+        elif op == 'status':
+            return self.status()
+        raise ValueError('unknown op \'%s\'' % op)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle(json.loads(line), writer)
+                except (ValueError, KeyError, TypeError) as error:
+                    response = {'error': str(error)}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for subscriber in [s for s in self.subscribers if s.writer is writer]:
+                self.subscribers.discard(subscriber)
+                subscriber.task.cancel()
+            writer.close()
+
+    async def serve(self, address):
+        # address: 'unix:PATH' or 'HOST:PORT'
+        if address.startswith('unix:'):
+            server = await asyncio.start_unix_server(self._connection, address[len('unix:'):])
+        else:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self._connection, host, int(port))
+        LOG.info('Serving on %s' % address)
+        return server
+
+
+def run(G, algorithms, address, initialize=False, **kwargs):
+    # Runs the service until interrupted.
+    async def main():
+        service = MiningService(G, algorithms, **kwargs)
+        await service.start(initialize)
+        server = await service.serve(address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await service.stop()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,76 @@
+import hashlib
+import logging
+import mmap
+import os
+from array import array
+
+from tesseract import graph
+
+
+# Layout (native byte order): magic, header [num_vertices, num_targets,
+# num_ids] as uint64, offsets as uint64, targets as uint32, ids as uint32.
+# Every section starts aligned to its item size so it can be cast in place.
+MAGIC = b'TSNPCSR1'
+BYTE_ORDER_MARK = 0x01020304
+
+LOG = logging.getLogger('SNAP')
+
+
+def save(G, path):
+    if isinstance(G, graph.DynamicGraph):
+        G.compact()
+    n = G.number_of_nodes()
+    offsets = array('Q', G.offsets[:n + 1])
+    targets = array('I', G.targets[:offsets[n]])
+    ids = array('I', G.ids) if G.ids is not None else array('I')
+    tmp = '%s.tmp%d' % (path, os.getpid())
+    with open(tmp, 'wb') as file:
+        file.write(MAGIC)
+        array('Q', [BYTE_ORDER_MARK, n, len(targets), len(ids)]).tofile(file)
+        offsets.tofile(file)
+        targets.tofile(file)
+        ids.tofile(file)
+    os.replace(tmp, path)  # never leave a half-written snapshot behind
+
+
+def load(path, graph_class=graph.CSRGraph):
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError('\'%s\' is not a graph snapshot' % path)
+    pos = len(MAGIC)
+    mark, n, m, k = view[pos:pos + 32].cast('Q')
+    if mark != BYTE_ORDER_MARK:
+        raise ValueError('\'%s\' was written with another byte order' % path)
+    pos += 32
+    offsets = view[pos:pos + 8 * (n + 1)].cast('Q')
+    pos += 8 * (n + 1)
+    targets = view[pos:pos + 4 * m].cast('I')
+    pos += 4 * m
+    ids = view[pos:pos + 4 * k].cast('I') if k > 0 else None
+    return graph_class(offsets, targets, ids=ids)
+
+
+def file_key(path):
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    digest = hashlib.sha1(('%s:%d:%d' % (path, stat.st_mtime_ns, stat.st_size)).encode()).hexdigest()
+    return '%s-%s' % (os.path.basename(path), digest[:16])
+
+
+def generator_key(name, n, p, seed):
+    return '%s-n%d-p%r-s%d' % (name, n, p, seed)
+
+
+def cached(cache_dir, key, build, graph_class=graph.CSRGraph, refresh=False):
+    # Returns the snapshot for key, calling build() and saving its result
+    # first if there is none yet (or refresh is set).
+    path = os.path.join(cache_dir, key + '.snap')
+    if refresh or not os.path.exists(path):
+        LOG.info('Building snapshot \'%s\'...' % path)
+        os.makedirs(cache_dir, exist_ok=True)
+        save(build(), path)
+    else:
+        LOG.info('Using snapshot \'%s\'' % path)
+    return load(path, graph_class)
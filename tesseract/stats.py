@@ -0,0 +1,89 @@
+import heapq
+import json
+from timeit import default_timer as timer
+
+
+class ExplorationStats:
+    # Exploration tree counters, indexed by depth (the size of the embedding
+    # a candidate would create), totals of the heaviest roots and updates,
+    # and time per phase. Attach one as alg.stats: the explorers only touch
+    # it when it is set, and then only with list increments.
+
+    COUNTERS = ('candidates', 'rejected_r1', 'rejected_r2', 'rejected_batch', 'rejected_filter', 'matches')
+
+    def __init__(self, top=20):
+        self.top = top
+        self.reset()
+
+    def reset(self):
+        self.candidates = [0]
+        self.rejected_r1 = [0]
+        self.rejected_r2 = [0]
+        self.rejected_batch = [0]
+        self.rejected_filter = [0]
+        self.matches = [0]
+        self.phases = {}
+        self.items = []  # heap of the top heaviest (candidates, matches, seconds, item)
+        self._item = None
+
+    def reach(self, depth):
+        # makes sure the counters of depth exist and returns it
+        if len(self.candidates) <= depth:
+            for name in self.COUNTERS:
+                counter = getattr(self, name)
+                counter.extend([0] * (depth + 1 - len(counter)))
+        return depth
+
+    def reject(self, depth, r1):
+        if r1:
+            self.rejected_r1[depth] += 1
+        else:
+            self.rejected_r2[depth] += 1
+
+    def match(self, depth):
+        self.matches[self.reach(depth)] += 1
+
+    def begin(self, item):
+        # item is a root vertex or an updated edge
+        self._item = (item, sum(self.candidates), sum(self.matches), timer())
+
+    def end(self):
+        item, candidates, matches, start = self._item
+        entry = (sum(self.candidates) - candidates, sum(self.matches) - matches, timer() - start, str(item))
+        self._push(entry)
+        self._item = None
+
+    def _push(self, entry):
+        if len(self.items) < self.top:
+            heapq.heappush(self.items, entry)
+        elif entry > self.items[0]:
+            heapq.heapreplace(self.items, entry)
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def merge(self, other):
+        for name in self.COUNTERS:
+            counter = getattr(self, name)
+            self.reach(len(getattr(other, name)) - 1)
+            for depth, count in enumerate(getattr(other, name)):
+                counter[depth] += count
+        for phase, seconds in other.phases.items():
+            self.add_time(phase, seconds)
+        for entry in other.items:
+            self._push(entry)
+
+    def to_dict(self):
+        return {
+            'depths': [dict(depth=depth, **{name: getattr(self, name)[depth] for name in self.COUNTERS})
+                       for depth in range(1, len(self.candidates))],
+            'totals': {name: sum(getattr(self, name)) for name in self.COUNTERS},
+            'phases': self.phases,
+            'heaviest': [{'item': item, 'candidates': candidates, 'matches': matches, 'seconds': seconds}
+                         for candidates, matches, seconds, item in sorted(self.items, reverse=True)],
+        }
+
+
+def dump(report, path):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
@@ -0,0 +1,161 @@
+import logging
+import math
+import sys
+from array import array
+from timeit import default_timer as timer
+
+from tesseract import mining
+
+
+LOG = logging.getLogger('STRM')
+
+
+def read_updates(file):
+    # Yields (update, timestamp, arrival) for every line '[+|-] u v [timestamp]'
+    # of an open file (a pipe or sys.stdin work too) as soon as it is read.
+    # update is [u, v, op] (see mining.update_op), timestamp None if absent
+    # and arrival the time the line was read. Blank and '#' lines are skipped.
+    for line in file:
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        op = mining.ADD
+        if fields[0] in (mining.ADD, mining.REMOVE):
+            op = fields.pop(0)
+        if len(fields) not in (2, 3):
+            raise ValueError('invalid update \'%s\'' % line.strip())
+        timestamp = float(fields[2]) if len(fields) == 3 else None
+        yield [int(fields[0]), int(fields[1]), op], timestamp, timer()
+
+
+def open_updates(path):
+    return sys.stdin if path == '-' else open(path, 'r')
+
+
+def micro_batches(updates, size=None, window=None):
+    # Groups (update, timestamp, arrival) items into lists of at most size
+    # items spanning at most window seconds, of timestamps when both updates
+    # have one, of arrival times otherwise. A batch only closes when the
+    # next update arrives or the stream ends, since reading blocks.
+    batch, start = [], None
+    for item in updates:
+        if batch and window is not None and _elapsed(start, item) >= window:
+            yield batch
+            batch = []
+        if not batch:
+            start = item
+        batch.append(item)
+        if size is not None and len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _elapsed(first, item):
+    if first[1] is not None and item[1] is not None:
+        return item[1] - first[1]
+    return item[2] - first[2]
+
+
+class LatencyHistogram:
+    # Log-scale buckets (BUCKETS_PER_DOUBLING per factor 2 from MIN_LATENCY
+    # seconds), so memory stays bounded whatever the number of updates and
+    # percentiles are within 1 - 2^(-1/BUCKETS_PER_DOUBLING) of the truth.
+    MIN_LATENCY = 1e-6
+    BUCKETS_PER_DOUBLING = 16
+
+    def __init__(self):
+        self.buckets = array('Q')
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        if latency > self.MIN_LATENCY:
+            i = int(math.log2(latency / self.MIN_LATENCY) * self.BUCKETS_PER_DOUBLING) + 1
+        else:
+            i = 0
+        if i >= len(self.buckets):
+            self.buckets.extend([0] * (i + 1 - len(self.buckets)))
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, q):
+        # upper bound of the bucket holding the q-th percentile
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n > 0:
+                return min(self.max, self.MIN_LATENCY * 2 ** (i / self.BUCKETS_PER_DOUBLING))
+        return self.max
+
+    def merge(self, other):
+        if len(other.buckets) > len(self.buckets):
+            self.buckets.extend([0] * (len(other.buckets) - len(self.buckets)))
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+def vertex_mapper(G, max_vertices=None):
+    # Stream ids are input ids: when G was relabelled, they are mapped to its
+    # vertices, and unseen ones become new vertices at the end of G.ids, up
+    # to max_vertices vertices (ValueError beyond).
+    if G.ids is None:
+        return None
+    G.ids = array('I', G.ids)
+    rank = {u: v for v, u in enumerate(G.ids)}
+
+    def vertex(u):
+        v = rank.get(u)
+        if v is None:
+            if max_vertices is not None and len(G.ids) >= max_vertices:
+                raise ValueError('vertex %d would grow the graph past %d vertices' % (u, max_vertices))
+            v = rank[u] = len(G.ids)
+            G.ids.append(u)
+        return v
+    return vertex
+
+
+def explore_stream(G, alg, updates, size=None, window=None, log_every=10):
+    # Applies a stream of (update, timestamp, arrival) items in micro-batches
+    # and returns (number of updates, elapsed seconds, latency histogram);
+    # the latency of an update is the time from its arrival to the end of
+    # the exploration of its batch. Without size or window, every update is
+    # its own batch: a batch only closes on the next update, which may be
+    # long in coming on a pipe.
+    if size is None and window is None:
+        size = 1
+    vertex = vertex_mapper(G)
+    latencies = LatencyHistogram()
+    num_updates, start = 0, timer()
+    for i, batch in enumerate(micro_batches(updates, size, window)):
+        run = [item[0] for item in batch]
+        if vertex is not None:
+            run = [[vertex(u), vertex(v), op] for u, v, op in run]
+        mining.middleout_explore_updates(G, alg, run, batch_size=len(run))
+        end = timer()
+        for _, _, arrival in batch:
+            latencies.add(end - arrival)
+        num_updates += len(batch)
+        if log_every and i % log_every == 0:
+            LOG.info('Processed updates: %d (p99 latency %0.6f seconds)' % (num_updates, latencies.percentile(99)))
+    return num_updates, timer() - start, latencies
@@ -0,0 +1,14 @@
+import time
+
+
+class AutoTimestamp:
+    # Strictly increasing timestamps in milliseconds since the epoch: calls
+    # within the same millisecond get the following ones.
+
+    def __init__(self):
+        self.last = 0
+
+    def timestamp(self):
+        now = int(time.time() * 1000)
+        self.last = now if now > self.last else self.last + 1
+        return self.last
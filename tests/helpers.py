@@ -0,0 +1,45 @@
+import random
+
+from tesseract import graph, io
+
+
+class Recorder(io.Output):
+    # Keeps every reported match as (tpe, vertices, sign), the vertices
+    # sorted unless ordered is set, and the motif counts by tpe.
+
+    def __init__(self, ordered=False):
+        self.ordered = ordered
+        self.matches = []
+        self.counts = {}
+
+    def found(self, e, G, tpe=None):
+        self.matches.append((tpe, tuple(e) if self.ordered else tuple(sorted(e)), 1))
+
+    def lost(self, e, G, tpe=None):
+        self.matches.append((tpe, tuple(e) if self.ordered else tuple(sorted(e)), -1))
+
+    def counted(self, tpe, delta):
+        self.counts[tpe] = self.counts.get(tpe, 0) + delta
+
+    def tally(self):
+        # matches found minus matches lost by tpe
+        tally = {}
+        for tpe, _, sign in self.matches:
+            tally[tpe] = tally.get(tpe, 0) + sign
+        return tally
+
+
+def random_graph(n, p, seed, graph_class=graph.CSRGraph):
+    return graph_class.from_edges(*graph.gnp_random_edges(n, p, seed), num_vertices=n)
+
+
+def random_edges(n, p, seed):
+    # the edges of random_graph(n, p, seed) as (u, v) tuples
+    return list(zip(*graph.gnp_random_edges(n, p, seed)))
+
+
+def random_pairs(n, m, seed):
+    # m vertex pairs drawn with replacement, self-loops and repeats included,
+    # as src and dst lists
+    rng = random.Random(seed)
+    return [rng.randrange(n) for _ in range(m)], [rng.randrange(n) for _ in range(m)]
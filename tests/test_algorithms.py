@@ -0,0 +1,30 @@
+from tesseract import algorithms, graph, mining
+from tests.helpers import Recorder, random_graph
+
+
+def test_static_motif_histogram_is_output():
+    G = random_graph(25, 0.2, 3)
+    out = Recorder()
+    alg = algorithms.create('motif,cycle', out, 4)
+    mining.forwards_explore_all(G, alg)
+    motifs = alg.algorithms['motif']
+    assert out.counts == dict(motifs.summary())
+    assert sum(out.counts.values()) == motifs.num_found
+
+
+def test_composite_masks_follow_graph_changes():
+    # the same embedding comes back after its edges changed: members must
+    # not reuse the masks it had before
+    updates = [[0, 1, '-'], [0, 1], [1, 2]]
+    separate = {}
+    for name in ('cycle', 'motif'):
+        out = Recorder()
+        mining.middleout_explore_updates(graph.DynamicGraph.from_edges([0, 0], [1, 2], num_vertices=3),
+                                         algorithms.create(name, out, 3), updates, batch_size=2)
+        separate[name] = out
+    out = Recorder()
+    mining.middleout_explore_updates(graph.DynamicGraph.from_edges([0, 0], [1, 2], num_vertices=3),
+                                     algorithms.create('cycle,motif', out, 3), updates, batch_size=2)
+    assert separate['cycle'].matches == [('3-cycle', (0, 1, 2), 1)]
+    assert out.matches == separate['cycle'].matches
+    assert out.counts == separate['motif'].counts
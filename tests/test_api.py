@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from tesseract import algorithms, api, graph, io, mining
+from tests.helpers import Recorder, random_graph
+
+
+def test_matches_use_input_ids():
+    G = graph.CSRGraph.from_edges([10, 20, 30, 30], [20, 30, 10, 40], relabel=True)
+    matches = list(api.iter_matches(G, 'clique', max=3))
+    assert [sorted(match.vertices) for match in matches] == [[10, 20, 30]]
+    assert G.original_ids([0, 3]) == [10, 40]
+
+
+def as_tuples(matches):
+    return sorted((match.type, tuple(sorted(match.vertices)), match.sign) for match in matches)
+
+
+def test_static_composite_matches_forwards_explore_all():
+    G = random_graph(40, 0.2, 1)
+    out = Recorder()
+    mining.forwards_explore_all(G, algorithms.create('clique,cycle,example', out, 5))
+    matches = api.iter_matches(G, algorithms.create('clique,cycle,example', io.NullOutput(), 5))
+    assert as_tuples(matches) == sorted(out.matches)
+
+
+def test_batched_updates_match_middleout_explore_updates():
+    edges = list(random_graph(30, 0.25, 2).edges())
+    updates = [list(edge) for edge in edges] + [[u, v, '-'] for u, v in edges[::3]] + [list(edges[0])]
+    for name in ('clique', 'cycle', 'clique,cycle'):
+        out = Recorder()
+        mining.middleout_explore_updates(graph.DynamicGraph.empty(30), algorithms.create(name, out, 4), updates, 7)
+        G = graph.DynamicGraph.empty(30)
+        matches = api.iter_matches(G, name, mode='dynamic', updates=updates, batch_size=7, max=4)
+        assert as_tuples(matches) == sorted(out.matches), name
+        assert G.number_of_edges() == len(edges) - len(edges[::3]) + 1
+
+
+def test_limit_and_early_stop():
+    G = random_graph(40, 0.2, 3)
+    assert len(list(api.iter_matches(G, 'cycle', limit=5, max=4))) == 5
+    assert list(api.iter_matches(G, 'cycle', limit=0, max=4)) == []
+
+    # a consumer stopping in the middle of a batch leaves all of it applied
+    D = graph.DynamicGraph.empty(40)
+    matches = api.iter_matches(D, 'cycle', mode='dynamic', updates=[list(edge) for edge in G.edges()],
+                               batch_size=50, max=4)
+    next(iter(matches))
+    matches.close()
+    assert D.number_of_edges() == 50
+
+
+def test_exploration_stays_a_buffer_ahead():
+    # whatever the size of a root's subtree, the first match comes once
+    # found and the exploration then waits for the consumer
+    G = random_graph(60, 0.5, 4)
+    for name in ('clique', 'cycle'):
+        alg = algorithms.create(name, io.NullOutput(), 5)
+        matches = api.iter_matches(G, alg, buffer=8)
+        next(matches)
+        time.sleep(0.2)
+        assert alg.num_found <= 10, name  # 1 consumed, 8 queued, 1 waiting for room
+        matches.close()
+        assert isinstance(alg.out, io.NullOutput)
+
+
+def test_exploration_error_raised_to_consumer():
+    class Exploding(algorithms.Algorithm):
+        def filter(self, e, G, last_v):
+            if len(e) == 3:
+                raise ValueError('exploded')
+            return super().filter(e, G, last_v)
+
+    with pytest.raises(ValueError, match='exploded'):
+        list(api.iter_matches(random_graph(20, 0.3, 5), Exploding(io.NullOutput(), 4)))
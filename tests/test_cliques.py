@@ -0,0 +1,44 @@
+from tesseract import algorithms, cliques, graph, mining
+from tesseract.embedding import Embedding
+from tests.helpers import Recorder, random_edges, random_graph
+
+
+def pair(max, min=None):
+    # the clique engine and the generic explorer, on their own outputs
+    return (algorithms.CliqueFinding(Recorder(ordered=True), max, min=min),
+            algorithms.CliqueFinding(Recorder(ordered=True), max, intersect=False, min=min))
+
+
+def test_static_engine_matches_generic():
+    for seed in range(3):
+        G = random_graph(40, 0.3, seed)
+        for max, min in ((3, None), (4, None), (6, None), (5, 4)):
+            engine, generic = pair(max, min)
+            cliques.clique_explore_all(G, engine)
+            mining.forwards_explore_all(G, generic, prune_graph=False)
+            assert sorted(engine.out.matches) == sorted(generic.out.matches), (seed, max, min)
+            assert engine.num_found == generic.num_found > 0
+
+
+def test_update_engine_matches_generic():
+    # a batch inside a dense group: cliques with several batch edges are
+    # only reported from the first of them (Batch.brings_earlier)
+    edges = random_edges(30, 0.3, 4)
+    group = [(u, v) for u in range(8) for v in range(u + 1, 8) if (u * v) % 5 != 1]
+    for max in (3, 5):
+        engine, generic = pair(max)
+        G = graph.DynamicGraph.from_edges([u for u, _ in edges], [v for _, v in edges], num_vertices=30)
+        for edge in [(0, 29), (3, 17), (12, 20)]:
+            if not G.has_edge(*edge):
+                G.add_edge(*edge)
+                cliques.clique_explore_update(G, engine, edge)
+                mining.middleout_explore(G, generic, Embedding(G, edge), ignore=[edge[1]])
+        for sign, batch in ((1, mining.apply_batch(G, group)), (-1, mining.removal_batch(G, group[::2] + edges[:20]))):
+            assert len(batch) > 5
+            for alg in (engine, generic):
+                alg.begin_update(batch.edges, sign=sign)
+            for i, edge in enumerate(batch.edges):
+                cliques.clique_explore_update(G, engine, edge, batch=batch, position=i)
+                mining.middleout_explore(G, generic, Embedding(G, edge), ignore=[edge[1]], batch=batch, position=i)
+                assert sorted(engine.out.matches) == sorted(generic.out.matches), (max, sign, i)
+        assert engine.num_found == generic.num_found and len(engine.out.matches) > 10
@@ -0,0 +1,46 @@
+import random
+
+from tesseract import graph
+from tesseract.embedding import Embedding
+
+
+def rebuilt(G, vertices):
+    # count, first and extensions recomputed from scratch
+    count, first = {}, {}
+    for pos, v in enumerate(vertices):
+        for u in G.neighbors(v):
+            count[u] = count.get(u, 0) + 1
+            first.setdefault(u, pos)
+    return count, first, {u for u in count if u not in vertices}
+
+
+def test_push_pop_keep_extension_sets():
+    rng = random.Random(1)
+    for graph_class in (graph.CSRGraph, graph.DynamicGraph):
+        G = graph_class.from_edges(*graph.gnp_random_edges(30, 0.2, 2), num_vertices=30)
+        s = Embedding(G, [0])
+        history = [(dict(s.count), dict(s.first), set(s.members))]
+        for _ in range(500):
+            extensions = s.extensions()
+            if len(s) > 1 and (not extensions or len(s) >= 6 or rng.random() < 0.4):
+                s.pop()
+                history.pop()
+                # popping restores exactly the state before the push
+                assert (s.count, s.first, s.members) == history[-1]
+            else:
+                s.push(rng.choice(extensions))
+                history.append((dict(s.count), dict(s.first), set(s.members)))
+            count, first, extensions = rebuilt(G, s.vertices)
+            assert s.count == count and s.first == first
+            assert sorted(s.extensions()) == sorted(extensions)
+            assert s.members == set(s.vertices) and all(v in s for v in s.vertices)
+
+
+def test_leaf_push_skips_bookkeeping():
+    G = graph.CSRGraph.from_edges([0, 1, 2], [1, 2, 3])
+    s = Embedding(G, [0, 1])
+    count, first = dict(s.count), dict(s.first)
+    s.push(2, extend=False)
+    assert s.vertices == [0, 1, 2] and 2 not in s and s.count == count and s.first == first
+    assert s.pop(extend=False) == 2
+    assert s.vertices == [0, 1] and s.count == count and s.first == first
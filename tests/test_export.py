@@ -0,0 +1,97 @@
+import pytest
+
+from tesseract import export
+from tests.helpers import random_pairs
+
+
+class DuplicateKeyError(Exception):
+    # the shape of pymongo's BulkWriteError
+    def __init__(self, codes):
+        super().__init__('duplicate keys')
+        self.details = {'writeErrors': [{'code': code} for code in codes]}
+
+
+class FakeCollection:
+    # the few pymongo collection methods the export uses; fails after
+    # fail_after insert_many calls when set
+    def __init__(self, fail_after=None):
+        self.documents = {}
+        self.inserts = 0
+        self.fail_after = fail_after
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail_after is not None and self.inserts >= self.fail_after:
+            raise ConnectionError('connection lost')
+        self.inserts += 1
+        duplicates = [export.DUPLICATE_KEY for document in documents if document['_id'] in self.documents]
+        for document in documents:
+            self.documents.setdefault(document['_id'], document)
+        if duplicates:
+            raise DuplicateKeyError(duplicates)
+
+    def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+    def replace_one(self, query, document, upsert=False):
+        self.documents[query['_id']] = document
+
+
+def expected_adjacency(src, dst, min_vertex=0, max_vertex=1 << 32):
+    adjacency = {}
+    for u, v in zip(src, dst):
+        u, v = min(u, v), max(u, v)
+        if u != v and min_vertex <= u < max_vertex:
+            adjacency.setdefault(str(u), set()).add(str(v))
+    return adjacency
+
+
+def neighbors(collection):
+    return {key: set(document['neighbors']) for key, document in collection.documents.items()}
+
+
+def test_bulk_insert():
+    src, dst = random_pairs(200, 1500, 1)
+    collection = FakeCollection()
+    written = export.export(src, dst, collection, 10, 150, batch_size=16, chunk_size=100)
+    assert neighbors(collection) == expected_adjacency(src, dst, 10, 150)
+    assert written == len(collection.documents)
+    assert collection.inserts == (written + 15) // 16
+
+
+def test_resume_after_last_written_vertex():
+    src, dst = random_pairs(200, 1500, 2)
+    collection, progress = FakeCollection(fail_after=3), FakeCollection()
+    with pytest.raises(ConnectionError):
+        export.export(src, dst, collection, batch_size=10, chunk_size=128, progress=progress, name='g')
+    assert export.last_written(progress, 'g') == max(int(key) for key in collection.documents)
+
+    collection.fail_after = None
+    written = export.export(src, dst, collection, batch_size=10, chunk_size=128, progress=progress, name='g')
+    assert written == len(expected_adjacency(src, dst)) - 30
+    assert neighbors(collection) == expected_adjacency(src, dst)
+
+
+def test_skips_documents_already_written():
+    src, dst = random_pairs(50, 200, 3)
+    collection = FakeCollection()
+    export.export(src, dst, collection, batch_size=7)
+    del collection.documents[min(collection.documents, key=int)]
+    export.export(src, dst, collection, batch_size=7)
+    assert neighbors(collection) == expected_adjacency(src, dst)
+
+
+def test_runs_sort_each_chunk():
+    src, dst = random_pairs(300, 1000, 4)
+    runs = list(export.sorted_edge_runs(src, dst, 20, 250, chunk_size=64))
+    assert len(runs) == 16
+    for i, run in enumerate(runs):
+        edges = zip(src[64 * i:64 * (i + 1)], dst[64 * i:64 * (i + 1)])
+        assert list(run) == sorted(min(u, v) << 32 | max(u, v) for u, v in edges if u != v and 20 <= min(u, v) < 250)
+
+
+def test_numpy_runs_match_python_runs(monkeypatch):
+    pytest.importorskip('numpy')
+    src, dst = random_pairs(300, 1000, 4)
+    runs = list(export.sorted_edge_runs(src, dst, 20, 250, chunk_size=64))
+    monkeypatch.setattr(export, 'np', None)
+    assert runs == list(export.sorted_edge_runs(src, dst, 20, 250, chunk_size=64))
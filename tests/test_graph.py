@@ -0,0 +1,127 @@
+import random
+from array import array
+from collections import deque
+
+import pytest
+
+from tesseract import graph
+from tests.helpers import random_graph, random_pairs
+
+
+def distances(G, sources):
+    # one plain BFS per source, keeping the smallest distance
+    dist = {}
+    for s in sources:
+        seen, queue = {s: 0}, deque([s])
+        while queue:
+            v = queue.popleft()
+            for u in G.neighbors(v):
+                if u not in seen:
+                    seen[u] = seen[v] + 1
+                    queue.append(u)
+        for v, d in seen.items():
+            dist[v] = min(d, dist.get(v, d))
+    return dist
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(graph, 'np', None)
+
+
+def test_multi_source_bfs_matches_reference(backend):
+    for seed in range(5):
+        G = random_graph(80, 0.03, seed)
+        sources = [3, 17, 17, 40, 79]
+        dist = distances(G, sources)
+        for depth in (0, 1, 2, 5):
+            reached, visited = graph.multi_source_bfs(G, sources, depth)
+            expected = [sum(1 for d in dist.values() if d == i) for i in range(depth + 1)]
+            while expected and expected[-1] == 0:
+                expected.pop()
+            assert reached == expected, (seed, depth)
+            assert [v for v in G.nodes if visited[v]] == sorted(v for v, d in dist.items() if d <= depth)
+
+
+def test_neighborhood_coverage(backend):
+    G = random_graph(200, 0.01, 7)
+    for fraction in (0.05, 0.3, 1.0):
+        dist = distances(G, graph.sample_edge_endpoints(G, fraction, seed=1))
+        coverage = graph.neighborhood_coverage(G, 4, fraction, seed=1)
+        assert coverage == [sum(1 for d in dist.values() if d <= i) / 200 for i in range(5)], fraction
+    # fraction 1 covers every vertex with an edge at depth 0
+    D = graph.DynamicGraph.from_edges([0, 1, 2], [1, 2, 3], num_vertices=10)
+    D.add_edge(4, 5)
+    assert graph.neighborhood_coverage(D, 2) == [0.6, 0.6, 0.6]
+
+
+def test_tracked_cores_match_decomposition():
+    rng = random.Random(3)
+    for cap in (1, 2, 3, 5):
+        G = random_graph(40, 0.1, cap, graph.DynamicGraph)
+        G.min_compact = 50  # compactions happen along the way too
+        G.track_cores(cap)
+        for _ in range(30):
+            edges = list(G.edges())
+            for _ in range(rng.randrange(1, 10)):
+                if edges and rng.random() < 0.4:
+                    G.remove_edge(*edges.pop(rng.randrange(len(edges))))
+                else:
+                    G.add_edge(rng.randrange(45), rng.randrange(45))  # also grows the graph
+            _, cores = graph.core_decomposition(G)
+            assert list(G.cores) == [min(c, cap) for c in cores], cap
+
+
+def test_csr_matches_edge_set(backend):
+    src, dst = random_pairs(30, 200, 4)  # with duplicates and self-loops
+    G = graph.CSRGraph.from_edges(src, dst, num_vertices=32)
+    adjacency = {v: set() for v in range(32)}
+    for u, v in zip(src, dst):
+        if u != v:
+            adjacency[u].add(v)
+            adjacency[v].add(u)
+    assert G.number_of_nodes() == 32 and G.ids is None
+    assert G.number_of_edges() == sum(map(len, adjacency.values())) // 2
+    for u in range(-1, 34):
+        for v in range(-1, 34):
+            assert G.has_edge(u, v) == (v in adjacency.get(u, ())), (u, v)
+    for v in G.nodes:
+        assert list(G.neighbors(v)) == sorted(adjacency[v]) and G.degree(v) == len(adjacency[v])
+    assert sorted(G.edges()) == sorted((u, v) for u in adjacency for v in adjacency[u] if u < v)
+
+
+def test_relabel_round_trip(backend):
+    rng = random.Random(5)
+    ids = rng.sample(range(1 << 32), 50)
+    edges = [(rng.choice(ids), rng.choice(ids)) for _ in range(150)]
+    G = graph.CSRGraph.from_edges([u for u, _ in edges], [v for _, v in edges], relabel=True)
+    used = sorted({u for edge in edges for u in edge})
+    assert list(G.ids) == used and G.number_of_nodes() == len(used)
+    expected = {tuple(sorted(edge)) for edge in edges if edge[0] != edge[1]}
+    assert {tuple(sorted(G.original_ids(edge))) for edge in G.edges()} == expected
+    rank = {u: v for v, u in enumerate(G.ids)}
+    for u, v in edges:
+        assert G.has_edge(rank[u], rank[v]) == (u != v)
+    assert G.original_ids([len(used)]) == [len(used)]  # vertices added later keep their index
+
+    # already dense ids are not relabelled
+    D = graph.CSRGraph.from_edges([0, 1, 2], [1, 2, 0], relabel=True)
+    assert D.ids is None and D.original_ids([2, 0]) == [2, 0]
+
+
+def test_from_edges_backends_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    rng = random.Random(6)
+    for relabel, span in ((False, 50), (True, 1 << 32), (True, 20)):
+        src = [rng.randrange(span) for _ in range(300)]
+        dst = [rng.randrange(span) for _ in range(300)]
+        G = graph.CSRGraph.from_edges(src, dst, num_vertices=60, relabel=relabel)
+        with monkeypatch.context() as patch:
+            patch.setattr(graph, 'np', None)
+            H = graph.CSRGraph.from_edges(src, dst, num_vertices=60, relabel=relabel)
+        assert (G.offsets, G.targets, G.ids) == (H.offsets, H.targets, H.ids), relabel
+        assert G.offsets.typecode == 'Q' and G.targets.typecode == 'I'
+    assert graph.CSRGraph.from_edges([], [], num_vertices=3).offsets == array('Q', [0] * 4)
@@ -0,0 +1,91 @@
+import os
+import random
+import struct
+
+import pytest
+
+from tesseract import graph, io
+
+
+EDGES = [(100, 7), (7, 3000000000), (42, 100), (100, 42), (5, 5)]
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def txt_backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(io, 'np', None)
+
+
+def test_txt_chunks(tmp_path, txt_backend):
+    rng = random.Random(1)
+    edges = [(rng.randrange(1 << 32), rng.randrange(1000)) for _ in range(500)]
+    lines = ['%d\t%d' % edge if i % 3 else '%d %d' % edge for i, edge in enumerate(edges)]
+    path = tmp_path / 'graph.txt'
+    path.write_text('\n'.join(lines))  # no final newline
+    for chunk_size in (7, 64, 1 << 20):
+        src, dst = io.read_txt_edges(str(path), chunk_size)
+        assert list(zip(src, dst)) == edges, chunk_size
+
+    # ids beyond uint32 are an error, never wrapped around
+    for text in ('1 2\n4294967296 3\n', '# ids\n1 2\n4294967296 3\n', '1 99999999999999999999999\n'):
+        path.write_text(text)
+        with pytest.raises(ValueError, match='between 0 and 4294967295'):
+            io.read_txt_edges(str(path))
+
+
+def test_txt_comments_and_bad_lines(tmp_path, txt_backend):
+    path = tmp_path / 'graph.txt'
+    path.write_text('# FromNodeId ToNodeId\n1 2\n3 4 5\n\n6 7\r\n#8 9\n10 11\n')
+    src, dst = io.read_txt_edges(str(path), chunk_size=8)
+    assert list(zip(src, dst)) == [(1, 2), (6, 7), (10, 11)]
+
+
+def test_loaders_relabel(tmp_path):
+    txt, xsc = tmp_path / 'graph.txt', tmp_path / 'graph.xsc'
+    txt.write_text(''.join('%d %d\n' % edge for edge in EDGES))
+    xsc.write_bytes(b''.join(struct.pack('II', u, v) for u, v in EDGES) + b'\0')  # trailing partial pair
+    for src, dst in (io.read_txt_edges(str(txt)), io.read_xsc_edges(str(xsc))):
+        assert list(zip(src, dst)) == EDGES
+        G = graph.CSRGraph.from_edges(src, dst, relabel=True)
+        assert list(G.ids) == [5, 7, 42, 100, 3000000000]
+        assert sorted(tuple(sorted(G.original_ids(edge))) for edge in G.edges()) == [
+            (7, 100), (7, 3000000000), (42, 100)]
+        assert G.degree(4) == 1 and G.has_edge(2, 3) and not G.has_edge(0, 0)
+
+
+def test_binary_patterns_round_trip(tmp_path):
+    rng = random.Random(2)
+    G = graph.CSRGraph.from_edges([0], [1])
+    records = []
+    for i in range(3000):
+        tpe = rng.choice([None, 'cycle', 'm4-3f'])
+        if i % 50 == 0:
+            records.append((tpe, None, rng.randrange(-5, 6)))
+        else:
+            records.append((tpe, [rng.randrange(1 << 32) for _ in range(rng.randrange(2, 6))], rng.choice([1, -1])))
+    for compress in (False, True):
+        path = str(tmp_path / ('patterns%d.bin' % compress))
+        out = io.BinaryPatternOutput(path, canonicalize=False, compress=compress, buffer_size=256, num_buffers=2)
+        for tpe, e, value in records:
+            if e is None:
+                out.counted(tpe, value)
+            elif value > 0:
+                out.found(e, G, tpe)
+            else:
+                out.lost(e, G, tpe)
+        out.close()
+        assert list(io.read_patterns(path, chunk_size=100)) == records, compress
+
+
+@pytest.mark.skipif(not os.path.exists('/dev/full'), reason='needs /dev/full')
+def test_binary_writer_error_raised():
+    # every write to /dev/full fails: the error comes out instead of a hang
+    G = graph.CSRGraph.from_edges([0], [1])
+    out = io.BinaryPatternOutput('/dev/full', canonicalize=False, buffer_size=1 << 14, num_buffers=2)
+    with pytest.raises(OSError):
+        for i in range(100000):
+            out.found([i, i + 1, i + 2], G)
+    with pytest.raises(OSError):
+        out.close()
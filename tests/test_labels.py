@@ -0,0 +1,41 @@
+import random
+from array import array
+
+from tesseract import algorithms, labels, mining
+from tests.helpers import Recorder, random_graph
+
+
+def labeled_graph(seed):
+    rng = random.Random(seed)
+    G = random_graph(25, 0.3, seed)
+    vertex_labels = array('I', [rng.choice([0, 1, 1, 2, 3]) for _ in G.nodes])
+    edge_labels = {edge: rng.choice([0, 4, 5]) for edge in G.edges()}
+    return G, labels.LabelIndex(G, vertex_labels, [None, 'a', 'b', 'c', 'x', 'y'], edge_labels)
+
+
+def matches(explore, G, name, *args, **kwargs):
+    alg = algorithms.create(name, Recorder(), 5)
+    explore(G, alg, *args, **kwargs)
+    return alg, sorted(alg.out.matches)
+
+
+def test_anchored_matches_filtered_forwards_matches():
+    for seed in range(2):
+        G, index = labeled_graph(seed)
+        for allowed, allowed_edges in ((None, None), ([2], None), ([2, 3], [0, 4])):
+            query = labels.LabelQuery(index, anchor=1, allowed=allowed, allowed_edges=allowed_edges)
+            H = labels.restrict(G, query)
+            for name in ('clique', 'cycle', 'example'):
+                alg = algorithms.create(name, Recorder(), 5)
+                alg.labels = query
+                labels.anchored_explore_all(H, alg, query)
+                _, expected = matches(mining.forwards_explore_all, H, name)
+                expected = [match for match in expected if query.anchored(match[1])]
+                if allowed_edges is None:
+                    # only vertices are restricted: the same as the matches
+                    # of the whole graph within the allowed labels
+                    _, unrestricted = matches(mining.forwards_explore_all, G, name)
+                    assert expected == [match for match in unrestricted
+                                        if query.anchored(match[1]) and all(query.allows(v) for v in match[1])]
+                assert sorted(alg.out.matches) == expected and expected, (seed, allowed, allowed_edges, name)
+                assert alg.num_found == len(expected)
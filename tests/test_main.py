@@ -0,0 +1,29 @@
+import json
+
+import main
+
+
+def dynamic_matches(tmp_path, *options):
+    path = tmp_path / 'stats.json'
+    args = main.build_parser().parse_args(['-n', '120', '-e', '0.08', '--max', '4', '-u', '150', '-a', 'cycle',
+                                           '-m', 'dynamic', '--stats', str(path)] + list(options))
+    main.main(args)
+    return json.loads(path.read_text())['dynamic']['matches']
+
+
+def test_updates_already_in_graph_skipped_batched_or_not(tmp_path):
+    # without -r the updates are edges of G, which no path may explore again
+    for options in ([], ['-b', '1'], ['-b', '40'], ['--engine', 'backwards'], ['--engine', 'backwards', '-b', '40']):
+        assert dynamic_matches(tmp_path, *options) == 0, options
+
+
+def test_unbatched_updates_agree_with_batches_of_one(tmp_path):
+    # larger batches report an embedding changed by several of their edges
+    # once, so only the same batch sizes are comparable
+    expected = dynamic_matches(tmp_path, '-r')
+    assert expected > 0
+    for options in (['-b', '1'], ['--engine', 'backwards'], ['--engine', 'backwards', '-b', '1']):
+        assert dynamic_matches(tmp_path, '-r', *options) == expected, options
+    batched = dynamic_matches(tmp_path, '-r', '-b', '40')
+    for options in (['--engine', 'backwards', '-b', '40'], ['-w', '2', '-b', '40']):
+        assert dynamic_matches(tmp_path, '-r', *options) == batched, options
@@ -0,0 +1,86 @@
+from tesseract import algorithms, graph, mining
+from tests.helpers import Recorder, random_edges
+
+
+def test_updates_independent_of_batch_size():
+    # repeated additions, self-loops and removals of missing edges are no updates
+    updates = [[1, 3], [3, 4], [1, 3], [2, 2], [0, 1], [1, 3, '-'], [1, 3, '-'], [1, 3], [0, 3]]
+    results = []
+    for batch_size in (1, 2, 3, len(updates)):
+        out = Recorder()
+        alg = algorithms.create('clique', out, 4)
+        G = graph.DynamicGraph.from_edges([0, 0, 1], [4, 5, 4], num_vertices=6)
+        mining.middleout_explore_updates(G, alg, updates, batch_size)
+        results.append((sorted(out.matches), alg.num_found))
+    assert all(result == results[0] for result in results)
+    assert results[0][1] == 5
+
+
+def explored(explore, alg, *args, **kwargs):
+    out = alg.out = Recorder()
+    explore(*args, **kwargs)
+    return sorted(out.matches)
+
+
+def test_backwards_engine_matches_middleout_per_edge():
+    edges = random_edges(30, 0.2, 5)
+    initial, updates = edges[:len(edges) // 2], edges[len(edges) // 2:]
+    for name in ('clique', 'cycle', 'example'):
+        alg = algorithms.create(name, Recorder(), 5)
+        G = graph.DynamicGraph.from_edges([u for u, _ in initial], [v for _, v in initial], num_vertices=30)
+        compared = 0
+
+        # single updates, each explored from the graph that has it
+        for edge in updates[:20]:
+            G.add_edge(*edge)
+            alg.begin_update([edge])
+            expected = explored(mining._explore_edge, alg, G, alg, edge, mining.ADD)
+            assert explored(mining.backwards_explore_edge, alg, G, alg, edge) == expected, (name, edge)
+            compared += len(expected)
+            alg.end_update()
+
+        # batches, added then removed: position i only reports what edges
+        # before it do not
+        for sign, batch in ((1, mining.apply_batch(G, updates[20:])), (-1, mining.removal_batch(G, edges[::3]))):
+            alg.begin_update(batch.edges, sign=sign)
+            for i, edge in enumerate(batch.edges):
+                expected = explored(mining.middleout_explore_batch_edge, alg, G, alg, batch, i)
+                assert explored(mining.backwards_explore_edge, alg, G, alg, edge, batch=batch, position=i) == expected, (name, sign, i)
+                compared += len(expected)
+            alg.end_update()
+        assert compared > 0, name
+
+
+def test_pruning_keeps_matches():
+    # a sparse graph with dense spots: most vertices are below the cores
+    src, dst = graph.gnp_random_edges(80, 0.04, 6)
+    src, dst = list(src), list(dst)
+    for u in range(10):
+        for v in range(u + 1, 10):
+            if (u + v) % 3:
+                src.append(u)
+                dst.append(v)
+    for name in ('clique', 'cycle', 'example'):
+        results = []
+        for prune_graph in (True, False):
+            out = Recorder()
+            mining.forwards_explore_all(graph.CSRGraph.from_edges(src, dst, num_vertices=80),
+                                        algorithms.create(name, out, 5), prune_graph=prune_graph)
+            results.append(sorted(out.matches))
+        assert results[0] == results[1] and results[0], name
+
+    # dynamic: updates below the tracked cores are not explored
+    updates = [[u, v] for u, v in zip(src, dst)]
+    updates += [[u, v, '-'] for u, v in updates[::4]] + updates[::8]
+    for name, create in (('cycle', lambda out: algorithms.create('cycle', out, 5)),
+                         ('clique', lambda out: algorithms.CliqueFinding(out, 5, intersect=False))):
+        results = []
+        for track in (True, False):
+            out, G = Recorder(), graph.DynamicGraph.empty(80)
+            alg = create(out)
+            if track:
+                mining.track_cores(G, alg)
+                assert G.cores is not None
+            mining.middleout_explore_updates(G, alg, updates, batch_size=6)
+            results.append(sorted(out.matches))
+        assert results[0] == results[1] and results[0], name
@@ -0,0 +1,39 @@
+import pytest
+
+from tesseract import algorithms, io, mining, parallel, sampling
+from tests.helpers import random_graph
+
+
+def counts(alg):
+    return {name: (member.num_found, member.num_filters) for name, member in alg.algorithms.items()}
+
+
+def test_composite_parallel_matches_serial():
+    # stolen tasks resume below steal_depth, with the members that accepted their prefix
+    for seed in range(4):
+        G = random_graph(40, 0.2, seed)
+        serial = algorithms.create('clique,cycle', io.NullOutput(), 5)
+        mining.forwards_explore_all(G, serial)
+        for steal_depth in (3, 4):
+            alg = algorithms.create('clique,cycle', io.NullOutput(), 5)
+            parallel.forwards_explore_all_parallel(G, alg, 4, steal_depth=steal_depth)
+            assert counts(alg) == counts(serial), (seed, steal_depth)
+
+
+class Exploding(algorithms.Algorithm):
+    def filter(self, e, G, last_v):
+        if last_v == 7:
+            raise ValueError('exploded on 7')
+        return super().filter(e, G, last_v)
+
+
+def test_worker_error_raised_in_parent():
+    G = random_graph(40, 0.2, 0)
+    with pytest.raises(RuntimeError, match='exploded on 7'):
+        parallel.forwards_explore_all_parallel(G, Exploding(io.NullOutput(), 4), 4)
+
+
+def test_sampling_worker_error_raised_in_parent():
+    G = random_graph(40, 0.2, 0)
+    with pytest.raises(RuntimeError, match='exploded on 7'):
+        sampling.approximate_count(G, Exploding(io.NullOutput(), 4), 'roots', samples=200, workers=2)
@@ -0,0 +1,89 @@
+import itertools
+import random
+
+from tesseract import patterns
+
+
+def masks_of(k, edges):
+    masks = [0] * k
+    for u, v in edges:
+        masks[u] |= 1 << v
+        masks[v] |= 1 << u
+    return tuple(masks)
+
+
+def connected_graphs(k):
+    pairs = list(itertools.combinations(range(k), 2))
+    for bits in range(1 << len(pairs)):
+        edges = [pair for i, pair in enumerate(pairs) if bits >> i & 1]
+        masks = masks_of(k, edges)
+        if patterns.is_connected(masks):
+            yield edges, masks
+
+
+def permuted(k, edges, perm):
+    return masks_of(k, [(perm[u], perm[v]) for u, v in edges])
+
+
+def matrix(masks, order):
+    return tuple(tuple(masks[u] >> v & 1 for v in order) for u in order)
+
+
+def brute_force_class(k, edges):
+    # smallest sorted edge list over all relabellings
+    return min(tuple(sorted(tuple(sorted((perm[u], perm[v]))) for u, v in edges))
+               for perm in itertools.permutations(range(k)))
+
+
+def test_codes_are_isomorphism_classes():
+    for k, num_classes in ((3, 2), (4, 6), (5, 21)):
+        classes = {}
+        for edges, masks in connected_graphs(k):
+            classes.setdefault(brute_force_class(k, edges), set()).add(patterns.canonical_code(masks))
+        assert len(classes) == num_classes
+        assert all(len(codes) == 1 for codes in classes.values()), k
+        assert len(set.union(*classes.values())) == num_classes, k
+
+
+def test_codes_invariant_under_permutation():
+    rng = random.Random(1)
+    for k in (6, 7, 9):
+        for _ in range(30):
+            edges = [pair for pair in itertools.combinations(range(k), 2) if rng.random() < 0.4]
+            perm = list(range(k))
+            rng.shuffle(perm)
+            masks, other = masks_of(k, edges), permuted(k, edges, perm)
+            (code, order), (other_code, other_order) = patterns.canonical_form(masks), patterns.canonical_form(other)
+            assert other_code == code
+            # both listed in canonical order have the same adjacency matrix
+            assert matrix(other, other_order) == matrix(masks, order)
+
+
+def brute_force_hamiltonian(masks):
+    k = len(masks)
+    return k >= 3 and any(all(masks[cycle[i - 1]] >> cycle[i] & 1 for i in range(k))
+                          for cycle in ([0] + list(rest) for rest in itertools.permutations(range(1, k))))
+
+
+def test_hamiltonian_matches_brute_force():
+    for k in (3, 4, 5):
+        for _, masks in connected_graphs(k):
+            assert patterns.is_hamiltonian(masks) == brute_force_hamiltonian(masks), masks
+    rng = random.Random(2)
+    for k in (6, 7, 8):
+        for p in (0.3, 0.5, 0.7):
+            for _ in range(20):
+                masks = masks_of(k, [pair for pair in itertools.combinations(range(k), 2) if rng.random() < p])
+                if patterns.is_connected(masks):
+                    assert patterns.is_hamiltonian(masks) == brute_force_hamiltonian(masks), masks
+
+
+def test_hamiltonian_search_beyond_dp_size():
+    k = patterns.MAX_DP_SIZE + 1
+    cycle = [(i, (i + 1) % k) for i in range(k)]
+    chords = [(0, 5), (2, 9), (4, 11)]
+    assert patterns.is_hamiltonian(masks_of(k, cycle + chords))
+    # a vertex that only joins two halves of a graph is a cut vertex: no cycle
+    half = [(u, v) for u, v in itertools.combinations(range(7), 2)]
+    other = [(u + 6, v + 6) for u, v in half]
+    assert not patterns.is_hamiltonian(masks_of(k, half + other))
@@ -0,0 +1,26 @@
+from tesseract import algorithms, io, mining, sampling
+from tests.helpers import Recorder, random_graph
+
+
+def test_estimates_cover_exact_counts():
+    G = random_graph(30, 0.3, 1)
+    for name in ('cycle', 'clique'):
+        out = Recorder()
+        mining.forwards_explore_all(G, algorithms.create(name, out, 4))
+        exact = dict(out.tally(), **{sampling.TOTAL: len(out.matches)})
+        for method, samples in (('roots', 2000), ('walks', 20000)):
+            estimate = sampling.approximate_count(G, algorithms.create(name, io.NullOutput(), 4), method, samples, seed=3)
+            assert estimate.samples == samples and set(estimate.sums) == set(exact), (name, method)
+            for tpe, count in exact.items():
+                value, low, high = estimate.interval(tpe, 0.999)
+                assert low <= count <= high, (name, method, tpe, count, value)
+                assert abs(value - count) < 0.25 * count, (name, method, tpe, count, value)
+
+
+def test_estimates_independent_of_workers():
+    G = random_graph(30, 0.2, 2)
+    for method in sampling.METHODS:
+        estimates = [sampling.approximate_count(G, algorithms.create('cycle,clique', io.NullOutput(), 4), method,
+                                                samples=301, workers=workers, seed=7) for workers in (1, 3)]
+        assert estimates[0].sums == estimates[1].sums and estimates[0].squares == estimates[1].squares, method
+        assert estimates[0].samples == estimates[1].samples == 301
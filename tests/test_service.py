@@ -0,0 +1,114 @@
+import asyncio
+
+from tesseract import algorithms, graph, io, service
+from tests.helpers import random_edges
+
+
+def serve_counts(edges, updates, algs):
+    G = graph.DynamicGraph.from_edges([u for u, _ in edges], [v for _, v in edges], num_vertices=30)
+
+    async def run():
+        mining_service = service.MiningService(G, algs)
+        await mining_service.start(initialize=True)
+        await mining_service.submit(updates, wait=True)
+        counts = mining_service.count()['counts']
+        await mining_service.stop()
+        return counts
+
+    return asyncio.run(run())
+
+
+def test_composite_members_match_separate_runs():
+    edges = random_edges(30, 0.2, 1)
+    initial, updates = edges[:len(edges) // 2], [list(edge) for edge in edges[len(edges) // 2:]]
+    updates += [[u, v, '-'] for u, v in edges[::4]]
+    names = ['clique', 'cycle', 'motif']
+
+    composite = algorithms.create(','.join(names), io.NullOutput(), 4)
+    fused = serve_counts(initial, updates, composite.algorithms)
+    separate = serve_counts(initial, updates, {name: algorithms.create(name, io.NullOutput(), 4) for name in names})
+
+    assert fused == separate
+    assert fused['cycle'] and fused['motif']
+
+
+def test_invalid_updates_rejected():
+    G = graph.DynamicGraph.empty(4)
+
+    async def run():
+        mining_service = service.MiningService(G, {'clique': algorithms.create('clique', io.NullOutput(), 3)})
+        await mining_service.start()
+        errors = []
+        for updates in ([['a', 1]], [[0, 1, 2]], [[0]], [[0, -1]], [[0, 1, '*']], [[0, True]]):
+            try:
+                await mining_service.handle({'op': 'update', 'updates': updates}, None)
+            except ValueError as error:
+                errors.append(str(error))
+        version = await mining_service.submit([[0, 1], [1, 2, '+'], (0, 2)], wait=True)
+        await mining_service.stop()
+        return errors, version
+
+    errors, version = asyncio.run(run())
+    assert len(errors) == 6 and all(error.startswith('invalid update') for error in errors)
+    assert version == 1 and G.number_of_edges() == 3
+
+
+def test_stop_fails_pending_waiters():
+    G = graph.DynamicGraph.empty(30)
+    updates = [list(edge) for edge in random_edges(30, 0.3, 2)]
+
+    async def run():
+        mining_service = service.MiningService(G, {'cycle': algorithms.create('cycle', io.NullOutput(), 5)},
+                                               queue_size=2, max_batch=1)
+        await mining_service.start()
+        pending = [asyncio.ensure_future(mining_service.submit([update], wait=True)) for update in updates[:8]]
+        await asyncio.sleep(0)
+        await mining_service.stop()
+        done, not_done = await asyncio.wait(pending, timeout=5)
+        return [task.exception() for task in done], len(not_done)
+
+    errors, hanging = asyncio.run(run())
+    assert hanging == 0
+    assert any(isinstance(error, RuntimeError) for error in errors)
+
+
+def test_input_ids_in_updates_and_queries():
+    G = graph.DynamicGraph.from_edges([10, 20], [20, 30], relabel=True)
+
+    async def run():
+        mining_service = service.MiningService(G, {'clique': algorithms.create('clique', io.NullOutput(), 4)},
+                                               max_vertices=5)
+        await mining_service.start(initialize=True)
+        await mining_service.submit([[10, 30], [10, 40], [20, 40], [30, 40]], wait=True)
+        touching = mining_service.touching(10)['matches']
+        try:
+            await mining_service.submit([[10, 50], [10, 60]])
+        except ValueError as error:
+            rejected = str(error)
+        await mining_service.stop()
+        return touching, mining_service.count()['counts'], rejected
+
+    touching, counts, rejected = asyncio.run(run())
+    assert G.number_of_nodes() == 4
+    assert sorted(tuple(match['vertices']) for match in touching) == [
+        (10, 20, 30), (10, 20, 30, 40), (10, 20, 40), (10, 30, 40)]
+    assert sum(counts['clique'].values()) == 5
+    assert rejected.startswith('invalid update [10, 60]')
+
+
+def test_vertex_ids_bounded():
+    G = graph.DynamicGraph.empty(4)
+
+    async def run():
+        mining_service = service.MiningService(G, {'clique': algorithms.create('clique', io.NullOutput(), 3)},
+                                               max_vertices=100)
+        await mining_service.start()
+        try:
+            await mining_service.submit([[0, 1], [0, 1 << 40]])
+        except ValueError as error:
+            return str(error)
+        finally:
+            await mining_service.stop()
+
+    assert asyncio.run(run()).startswith('invalid update [0, 1099511627776]')
+    assert G.number_of_nodes() == 4 and G.number_of_edges() == 0
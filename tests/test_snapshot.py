@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from tesseract import graph, snapshot
+
+
+def relabelled_graph():
+    src, dst = graph.gnp_random_edges(40, 0.15, 1)
+    return graph.CSRGraph.from_edges([10 * u + 7 for u in src], [10 * v + 7 for v in dst], relabel=True)
+
+
+def edge_set(G):
+    return {tuple(sorted(G.original_ids(edge))) for edge in G.edges()}
+
+
+def test_round_trip(tmp_path):
+    G = relabelled_graph()
+    path = str(tmp_path / 'g.snap')
+    snapshot.save(G, path)
+    H = snapshot.load(path)
+    assert list(H.offsets) == list(G.offsets) and list(H.targets) == list(G.targets)
+    assert list(H.ids) == list(G.ids)
+    assert edge_set(H) == edge_set(G) and H.number_of_nodes() == G.number_of_nodes()
+
+    # a dynamic graph over the read-only mapping keeps its changes aside
+    D = snapshot.load(path, graph.DynamicGraph)
+    u, v = next(D.edges())
+    n = D.number_of_nodes()
+    D.remove_edge(u, v)
+    D.add_edge(0, n)
+    expected = {tuple(sorted(edge)) for edge in G.edges()} - {tuple(sorted((u, v)))} | {(0, n)}
+    assert {tuple(sorted(edge)) for edge in D.edges()} == expected
+    D.compact()
+    assert {tuple(sorted(edge)) for edge in D.edges()} == expected
+    assert D.number_of_nodes() == n + 1 and D.has_edge(n, 0) and not D.has_edge(u, v)
+    assert edge_set(snapshot.load(path)) == edge_set(G)  # the file is untouched
+
+    # a dynamic graph with pending changes is saved as it is
+    snapshot.save(D, path)
+    assert {tuple(sorted(edge)) for edge in snapshot.load(path).edges()} == expected
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / 'g.snap'
+    path.write_bytes(b'not a snapshot at all, but long enough for a header')
+    with pytest.raises(ValueError):
+        snapshot.load(str(path))
+
+
+def test_file_key_follows_the_file(tmp_path):
+    path = tmp_path / 'g.txt'
+    path.write_text('0 1\n')
+    key = snapshot.file_key(str(path))
+    assert snapshot.file_key(str(path)) == key
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    touched = snapshot.file_key(str(path))
+    assert touched != key
+    with open(path, 'a') as file:
+        file.write('1 2\n')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # same mtime, other size
+    assert snapshot.file_key(str(path)) not in (key, touched)
+
+
+def test_cached_builds_once_unless_refreshed(tmp_path):
+    builds = []
+
+    def build():
+        builds.append(len(builds))
+        n = 3 + len(builds)
+        return graph.CSRGraph.from_edges(list(range(n - 1)), list(range(1, n)))
+
+    first = snapshot.cached(str(tmp_path / 'cache'), 'path', build)
+    again = snapshot.cached(str(tmp_path / 'cache'), 'path', build)
+    assert len(builds) == 1 and again.number_of_edges() == first.number_of_edges() == 3
+    refreshed = snapshot.cached(str(tmp_path / 'cache'), 'path', build, graph.DynamicGraph, refresh=True)
+    assert len(builds) == 2 and refreshed.number_of_edges() == 4 and isinstance(refreshed, graph.DynamicGraph)
+    assert snapshot.cached(str(tmp_path / 'cache'), 'path', build).number_of_edges() == 4
+    assert os.listdir(tmp_path / 'cache') == ['path.snap']
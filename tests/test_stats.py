@@ -0,0 +1,74 @@
+import json
+
+import main
+from tesseract import algorithms, graph, io, mining, stats
+from tests.helpers import random_edges, random_graph
+
+
+def explored(alg):
+    # every candidate is rejected by a rule, the batch or the filter, or accepted by it
+    s = alg.stats
+    assert sum(s.matches) == alg.num_found
+    accepted = alg.num_filters - sum(s.rejected_filter)
+    assert sum(s.candidates) == sum(s.rejected_r1) + sum(s.rejected_r2) + sum(s.rejected_batch) + sum(s.rejected_filter) + accepted
+    for depth in range(len(s.candidates)):
+        assert s.candidates[depth] >= s.rejected_r1[depth] + s.rejected_r2[depth] + s.rejected_batch[depth] + s.rejected_filter[depth]
+    return s
+
+
+def test_forwards_counters_add_up():
+    G = random_graph(40, 0.15, 2)
+    alg = algorithms.create('cycle', io.NullOutput(), 5)
+    alg.stats = stats.ExplorationStats()
+    mining.forwards_explore_all(G, alg)
+    s = explored(alg)
+    assert alg.num_found > 0 and sum(s.rejected_r1) > 0 and sum(s.rejected_r2) > 0
+    assert len(s.items) == min(s.top, G.number_of_nodes())
+
+
+def test_middleout_counters_add_up():
+    edges = random_edges(40, 0.15, 3)
+    for batch in (False, True):
+        G = graph.DynamicGraph.from_edges([u for u, _ in edges[:-30]], [v for _, v in edges[:-30]], num_vertices=40)
+        alg = algorithms.create('cycle', io.NullOutput(), 5)
+        alg.stats = stats.ExplorationStats()
+        if batch:
+            mining.middleout_explore_batch(G, alg, edges[-30:])
+        else:
+            for edge in edges[-30:]:
+                mining.middleout_explore_update(G, alg, edge)
+        s = explored(alg)
+        assert alg.num_found > 0 and sum(s.rejected_r2) > 0
+        assert (sum(s.rejected_batch) > 0) == batch
+
+
+def static_stats(tmp_path, *options):
+    path = tmp_path / 'stats.json'
+    args = main.build_parser().parse_args(['-n', '60', '-e', '0.12', '--max', '5', '-a', 'cycle', '-m', 'static',
+                                           '--stats', str(path)] + list(options))
+    main.main(args)
+    return json.loads(path.read_text())['static']
+
+
+def test_worker_stats_merge_into_serial_counts(tmp_path):
+    serial = static_stats(tmp_path)
+    parallel = static_stats(tmp_path, '-w', '3')
+    assert serial['matches'] > 0 and parallel['matches'] == serial['matches']
+    assert parallel['totals'] == serial['totals'] and parallel['depths'] == serial['depths']
+    assert parallel['totals']['matches'] == serial['matches']
+    assert len(parallel['heaviest']) == len(serial['heaviest'])
+
+
+def test_merge_adds_counters():
+    a, b = stats.ExplorationStats(top=2), stats.ExplorationStats(top=2)
+    a.candidates[a.reach(2)] += 3
+    b.candidates[b.reach(4)] += 5
+    b.match(3)
+    b.add_time('explore', 1.5)
+    for item in range(3):
+        b.begin(item)
+        b.candidates[4] += item
+        b.end()
+    a.merge(b)
+    assert a.candidates == [0, 0, 3, 0, 8] and a.matches == [0, 0, 0, 1, 0]
+    assert a.phases == {'explore': 1.5} and [entry[3] for entry in sorted(a.items)] == ['1', '2']
@@ -0,0 +1,27 @@
+import os
+import threading
+import time
+
+from tesseract import algorithms, graph, io, stream
+
+
+def test_pipe_updates_mined_as_they_arrive():
+    # without -b or --window, an update must not wait for the next one
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with os.fdopen(write_fd, 'w') as file:
+            for u, v in ((0, 1), (1, 2), (0, 2)):
+                file.write('%d %d\n' % (u, v))
+                file.flush()
+                time.sleep(0.3)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    G = graph.DynamicGraph.empty(3)
+    alg = algorithms.create('clique', io.NullOutput(), 3)
+    with os.fdopen(read_fd, 'r') as file:
+        num_updates, _, latencies = stream.explore_stream(G, alg, stream.read_updates(file))
+    thread.join()
+    assert num_updates == 3 and alg.num_found == 1
+    assert latencies.max < 0.2